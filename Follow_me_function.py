@@ -1,12 +1,23 @@
 import cv2
-import numpy as np
-import pyttsx3
 import threading
-from movement_controller import send_command
-from always_top import set_window_always_on_top
+import model_registry
+import face_detection
+from motion_gate import MotionGate
+from tracking_pipeline import HybridTracker
+from steering import SteeringController
+import tts_worker
+import session_recording
+from frame_pipeline import LatestSlot, FpsCounter, CaptureThread
+import metrics
 import time
 
 
+def send_command(command):
+    """Motor output of a live session. The serial stack is imported here, so replay runs without it."""
+    from movement_controller import send_command as motor_send_command
+    return motor_send_command(command)
+
+
 # ------------------------------
 # Global Variables
 # ------------------------------
@@ -16,42 +27,93 @@ selected_face = None
 tracker = None
 tracking = False
 exit_requested = False
+latest_frame = None  # Unannotated frame the current `faces` were found in
+state_lock = threading.Lock()  # Processing thread vs. mouse callback (UI thread)
+recorder = None           # session_recording.Recorder while main(record_path=...) runs
+command_sink = send_command  # Where motor commands go; replay collects them instead
+announcements = True      # Replay runs silently
+WINDOW_NAME = "Face Selection and Tracking"
 exit_button_position = (50, 50, 150, 100)
 deselect_button_position = (50, 120, 150, 170)
-engine = pyttsx3.init()
+detector = None  # BatchInferenceEngine, created on first use (load_detector)
+_init_lock = threading.Lock()
+
+# DNN backend/target and detector input size (see model_registry.py)
+DNN_BACKEND = model_registry.DEFAULT_BACKEND
+DNN_TARGET = model_registry.DEFAULT_TARGET
+DETECT_INPUT_SIZE = model_registry.DEFAULT_INPUT_SIZE
+
+# Re-detection while tracking only searches a crop around the tracked face
+ROI_DETECTION = True
+# Skip detection while nothing in front of the robot moves (see motion_gate.py)
+MOTION_GATING = True
+motion_gate = MotionGate(name="follow_me_window")
+# Camera resolution, e.g. (320, 240) to cut per-frame pixel work; None keeps the driver default
+CAPTURE_SIZE = None
+
+# Tracker backend and re-detection interval (see tracking_pipeline.py)
+TRACKER_TYPE = "csrt"   # "kcf" or "mosse" when CPU is scarce
+REDETECT_EVERY = 10
+
+# Smoothing, hysteresis, dwell and rate cap between the tracker and the motor (see steering.py)
+steering = SteeringController()
+
+
+# Fixed announcements, pre-rendered by the TTS worker so they start instantly
+MSG_SELECT = "Please select the face you want to track by clicking on it."
+MSG_DESELECTED = "Face deselected. Ready to select another face."
+MSG_LOST = "Face detection was lost. Please select again."
+MSG_GOODBYE = "Thank you for using face tracking."
+tts = tts_worker.TtsWorker(phrases=[MSG_SELECT, MSG_DESELECTED, MSG_LOST, MSG_GOODBYE])
 
 
-def speak(text):
-    voices = engine.getProperty('voices')
-    engine.setProperty('voice', voices[1].id)
-    engine.setProperty('rate', 150)
-    engine.setProperty('volume', 1.0)
-    engine.say(text)
-    engine.runAndWait()
+def speak(text, priority=tts_worker.PRIORITY_NORMAL):
+    """Queues an announcement on the TTS worker; returns immediately."""
+    if announcements:
+        tts.say(text, priority)
 
 
 # ------------------------------
 # Improved Face Detection using DNN
 # ------------------------------
-def detect_faces_dnn(frame, net, conf_threshold=0.6):
-    """Detect faces using OpenCV DNN (SSD ResNet model)."""
-    h, w = frame.shape[:2]
-    blob = cv2.dnn.blobFromImage(cv2.resize(frame, (300, 300)), 1.0,
-                                 (300, 300), (104.0, 177.0, 123.0))
-    net.setInput(blob)
-    detections = net.forward()
-    faces = []
-    for i in range(detections.shape[2]):
-        confidence = detections[0, 0, i, 2]
-        if confidence > conf_threshold:
-            box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-            (x, y, x2, y2) = box.astype("int")
-            faces.append((x, y, x2 - x, y2 - y))
-    return faces
+def detect_faces_dnn(frame, detector, conf_threshold=0.6, focus_box=None):
+    """
+    Detect faces using OpenCV DNN (SSD ResNet model) via the shared batch engine.
+    Returns an (N, 4) array of (x, y, w, h) boxes after NMS, best first.
+
+    focus_box: optional (x, y, w, h); with ROI_DETECTION only a crop around
+    it is searched, which gives the detector more pixels on that face.
+    """
+    if ROI_DETECTION and focus_box is not None:
+        x, y, w, h = focus_box
+        roi = face_detection.expand_box((x, y, x + w, y + h), frame.shape)
+        boxes, _ = face_detection.detect_in_roi(detector, frame, roi, conf_threshold)
+        if len(boxes):
+            return face_detection.to_xywh(boxes)
+    boxes, _ = face_detection.detect(detector, frame, conf_threshold)
+    return face_detection.to_xywh(boxes)
+
+
+def load_detector():
+    """Returns the shared BatchInferenceEngine; the registry loads and warms the model once."""
+    global detector
+    with _init_lock:
+        if detector is None:
+            detector = model_registry.get_engine(backend=DNN_BACKEND, target=DNN_TARGET,
+                                                 input_size=DETECT_INPUT_SIZE)
+        return detector
+
+
+def warm_up():
+    """Starts the TTS worker (and phrase cache) and loads/warms the DNN model ahead of the first follow-me session."""
+    tts.start()
+    load_detector()
+    return True
 
 
 def initialize_tracker(frame, face_box):
-    tracker = cv2.TrackerCSRT_create()
+    tracker = HybridTracker(lambda f, box: detect_faces_dnn(f, detector, focus_box=box),
+                            tracker_type=TRACKER_TYPE, redetect_every=REDETECT_EVERY)
     tracker.init(frame, tuple(face_box))
     return tracker
 
@@ -60,14 +122,22 @@ def check_and_send_command(new_command):
     global previous_command
     if new_command != previous_command:
         print(new_command)
-        send_command(new_command)
+        command_sink(new_command)
         previous_command = new_command
+        if recorder is not None:
+            recorder.command(new_command)
+    if new_command == 's':
+        steering.reset()  # Motor stopped; the next zone is commanded straight away
 
 
 def select_face(event, x, y, flags, param):
     global selected_face, faces, tracking, tracker, exit_requested
-    frame = param
-    if event == cv2.EVENT_LBUTTONDOWN:
+    if event != cv2.EVENT_LBUTTONDOWN:
+        return
+    if recorder is not None:
+        recorder.click(x, y)
+    with state_lock:
+        frame = latest_frame
         # Exit Button
         if exit_button_position[0] < x < exit_button_position[2] and exit_button_position[1] < y < exit_button_position[3]:
             print("Exit button clicked!")
@@ -79,7 +149,8 @@ def select_face(event, x, y, flags, param):
             tracking = False
             tracker = None
             selected_face = None
-            threading.Thread(target=speak, args=("Face deselected. Ready to select another face.",)).start()
+            motion_gate.reset()
+            speak(MSG_DESELECTED, tts_worker.PRIORITY_URGENT)
             check_and_send_command('s')
             return
         # Face selection
@@ -88,111 +159,221 @@ def select_face(event, x, y, flags, param):
                 selected_face = (fx, fy, fw, fh)
                 tracker = initialize_tracker(frame, selected_face)
                 tracking = True
+                steering.reset()
                 break
 
 
-def track_face(tracker, frame):
+def track_face(tracker, frame, canvas=None, now=None):
+    """
+    Updates the tracker on `frame` and draws the box on `canvas` (default: frame).
+    `now` overrides the steering clock (recorded time during replay).
+    """
+    if canvas is None:
+        canvas = frame
     success, bbox = tracker.update(frame)
     if success:
         (x, y, w, h) = [int(v) for v in bbox]
-        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        cv2.rectangle(canvas, (x, y), (x + w, y + h), (0, 255, 0), 2)
         center_x = x + w // 2
-        width = frame.shape[1]
-        section_width = width // 5
-
-        if center_x < section_width:
-            check_and_send_command('5')
-            return "FAR LEFT", frame
-        elif center_x < 2 * section_width:
-            check_and_send_command('4')
-            return "LEFT", frame
-        elif center_x < 3 * section_width:
-            check_and_send_command('3')
-            return "CENTER", frame
-        elif center_x < 4 * section_width:
-            check_and_send_command('2')
-            return "RIGHT", frame
-        else:
-            check_and_send_command('1')
-            return "FAR RIGHT", frame
-    return "LOST", frame
+        position, command = steering.update(center_x, frame.shape[1], now)
+        if command is not None:
+            check_and_send_command(command)
+        return position, canvas
+    return "LOST", canvas
 
 
 # ------------------------------
 # MAIN
 # ------------------------------
-def main():
-    global faces, tracker, tracking, selected_face, exit_requested
-
-    threading.Thread(target=speak, args=("Please select the face you want to track by clicking on it.",)).start()
-
-    # Load DNN Model
-    import os
-
-    modelFile = os.path.join("models", "res10_300x300_ssd_iter_140000 (1).caffemodel")
-    configFile = os.path.join("models", "deploy.prototxt")
-
-    if not os.path.exists(modelFile) or not os.path.exists(configFile):
-        print("❌ Model files not found! Please download them from:")
-        print("https://github.com/opencv/opencv/tree/master/samples/dnn/face_detector")
-        exit()
-        
-    net = cv2.dnn.readNetFromCaffe(configFile, modelFile)
-
-
-    cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-    cv2.namedWindow("Face Selection and Tracking")
-
-    while True:
-        ret, frame = cap.read()
-        frame = cv2.flip(frame, 1)
-        if not ret:
-            break
-
-        # Face Detection
+def process_frames(capture_slot, render_slot, stop_event, fps, errors):
+    """
+    Processing stage: detection/tracking on the newest captured frame.
+    A failure is appended to `errors` and sets stop_event, so main() tears
+    the session down instead of showing a frozen window.
+    """
+    try:
+        while not stop_event.is_set():
+            frame = capture_slot.get(timeout=0.5)
+            if frame is None:
+                continue
+            if recorder is not None:
+                recorder.frame(frame)
+            render_slot.put(process_frame(frame))
+            fps.tick()
+    except Exception as e:
+        print(f"❌ Processing stage failed: {e}")
+        errors.append(e)
+    finally:
+        stop_event.set()
+
+
+def process_frame(frame, now=None):
+    """
+    Detection/tracking for one frame; returns an annotated copy. `now`
+    overrides the clock for motion gating and steering (used by replay).
+    """
+    global faces, tracker, tracking, latest_frame
+    annotated = frame.copy()
+
+    with state_lock:
+        latest_frame = frame
+
+        # Face Detection (previous faces are reused while the scene is static)
         if not tracking:
-            faces = detect_faces_dnn(frame, net)
+            if not MOTION_GATING or motion_gate.needs_detection(frame, now):
+                with metrics.timer("follow_me_detect_ms"):
+                    faces = detect_faces_dnn(frame, detector)
             for (x, y, w, h) in faces:
-                cv2.rectangle(frame, (x, y), (x + w, y + h), (255, 0, 0), 2)
+                cv2.rectangle(annotated, (x, y), (x + w, y + h), (255, 0, 0), 2)
 
-        # Tracking
+        # Tracking (track_face updates on the clean frame, draws on the copy)
         if tracking and selected_face is not None:
-            position, frame = track_face(tracker, frame)
+            with metrics.timer("follow_me_track_ms", tracker=TRACKER_TYPE):
+                position, _ = track_face(tracker, frame, annotated, now)
             if position == "LOST":
                 print("Lost track of the face.")
-                threading.Thread(target=speak, args=("Face detection was lost. Please select again.",)).start()
+                speak(MSG_LOST, tts_worker.PRIORITY_URGENT)
                 tracking = False
                 tracker = None
+                motion_gate.reset()
                 check_and_send_command('s')
 
-        # Exit & Deselect Buttons
-        cv2.rectangle(frame, (exit_button_position[0], exit_button_position[1]),
-                      (exit_button_position[2], exit_button_position[3]), (0, 0, 255), -1)
-        cv2.putText(frame, 'Exit', (exit_button_position[0] + 10, exit_button_position[1] + 40),
-                    cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+    return annotated
+
+
+def draw_buttons(frame):
+    # Exit & Deselect Buttons
+    cv2.rectangle(frame, (exit_button_position[0], exit_button_position[1]),
+                  (exit_button_position[2], exit_button_position[3]), (0, 0, 255), -1)
+    cv2.putText(frame, 'Exit', (exit_button_position[0] + 10, exit_button_position[1] + 40),
+                cv2.FONT_HERSHEY_SIMPLEX, 1, (255, 255, 255), 2)
+
+    cv2.rectangle(frame, (deselect_button_position[0], deselect_button_position[1]),
+                  (deselect_button_position[2], deselect_button_position[3]), (0, 255, 0), -1)
+    cv2.putText(frame, 'Deselect', (deselect_button_position[0] + 5, deselect_button_position[1] + 35),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+
 
-        cv2.rectangle(frame, (deselect_button_position[0], deselect_button_position[1]),
-                      (deselect_button_position[2], deselect_button_position[3]), (0, 255, 0), -1)
-        cv2.putText(frame, 'Deselect', (deselect_button_position[0] + 5, deselect_button_position[1] + 35),
-                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
+def reset_session():
+    """Clears selection/tracking state left over from a previous session."""
+    global faces, selected_face, tracker, tracking, exit_requested, latest_frame, previous_command
+    with state_lock:
+        faces = []
+        selected_face = None
+        tracker = None
+        tracking = False
+        exit_requested = False
+        latest_frame = None
+        previous_command = None
+        motion_gate.reset()
+        steering.reset()
 
-        cv2.imshow("Face Selection and Tracking", frame)
-        set_window_always_on_top('Face Selection and Tracking')
-        cv2.setMouseCallback("Face Selection and Tracking", select_face, frame)
+
+def main(stop_requested=None, record_path=None):
+    """
+    Runs three stages connected by single-slot queues: a capture thread that
+    keeps only the newest camera frame, a processing thread for detection and
+    tracking, and this (UI) thread for drawing, imshow and mouse input.
+
+    stop_requested: optional threading.Event; setting it ends the session
+    like the Exit button does (used by the server's follow-me job).
+    record_path: optional directory; processed frames, clicks and motor
+    commands are saved there for session_recording.replay().
+    """
+    global recorder
+    reset_session()
+
+    speak(MSG_SELECT)
+
+    # DNN model (already loaded and warm if warm_up() ran)
+    load_detector()
+
+    cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
+    if not cap.isOpened():
+        cap.release()
+        raise RuntimeError("Could not open the camera")
+    if CAPTURE_SIZE is not None:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, CAPTURE_SIZE[0])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAPTURE_SIZE[1])
+
+    if record_path is not None:
+        recorder = session_recording.Recorder(record_path)
+
+    # One-time window setup (win32 only, so imported here rather than for headless use)
+    from always_top import set_window_always_on_top
+    cv2.namedWindow(WINDOW_NAME)
+    set_window_always_on_top(WINDOW_NAME)
+    cv2.setMouseCallback(WINDOW_NAME, select_face)
+
+    stop_event = threading.Event()
+    capture_slot = LatestSlot()
+    render_slot = LatestSlot()
+    capture_thread = CaptureThread(cap, capture_slot, stop_event, transform=lambda f: cv2.flip(f, 1))
+    process_fps = FpsCounter()
+    processing_errors = []
+    process_thread = threading.Thread(target=process_frames, name="processing", daemon=True,
+                                      args=(capture_slot, render_slot, stop_event, process_fps, processing_errors))
+    ui_fps = FpsCounter()
+
+    def stage_gauges():
+        yield "follow_me_stage_fps", {"stage": "capture"}, round(capture_thread.fps.fps, 1)
+        yield "follow_me_stage_fps", {"stage": "processing"}, round(process_fps.fps, 1)
+        yield "follow_me_stage_fps", {"stage": "ui"}, round(ui_fps.fps, 1)
+        yield "follow_me_frames_dropped", {"stage": "processing"}, capture_slot.dropped
+        yield "follow_me_frames_dropped", {"stage": "ui"}, render_slot.dropped
+
+    metrics.register_gauge_fn(stage_gauges)
+    capture_thread.start()
+    process_thread.start()
+
+    try:
+        _ui_loop(stop_event, stop_requested, render_slot, capture_thread, process_fps, ui_fps)
+    finally:
+        stop_event.set()
+        metrics.unregister_gauge_fn(stage_gauges)
+        capture_thread.join(timeout=2)
+        process_thread.join(timeout=2)
+        print(f"Stage FPS - capture: {capture_thread.fps.fps:.1f}, processing: {process_fps.fps:.1f}, ui: {ui_fps.fps:.1f} "
+              f"(dropped before processing: {capture_slot.dropped}, before display: {render_slot.dropped})")
+        print(f"Steering commands - sent: {steering.sent}, suppressed: {steering.suppressed}")
+        cap.release()
+        cv2.destroyAllWindows()
+        if recorder is not None:
+            recorder.close()
+            recorder = None
+
+    if processing_errors:
+        if tracking:
+            check_and_send_command('s')  # Do not leave the robot steering toward a stale target
+        # Re-raised here so the follow-me job records it as last_error
+        raise RuntimeError(f"Follow-me processing failed: {processing_errors[0]}") from processing_errors[0]
+
+
+def _ui_loop(stop_event, stop_requested, render_slot, capture_thread, process_fps, ui_fps):
+    global exit_requested
+
+    while not stop_event.is_set():
+        frame = render_slot.get(timeout=0.1)
+        if frame is not None:
+            render_start = time.perf_counter()
+            draw_buttons(frame)
+            cv2.putText(frame, f"cap {capture_thread.fps.fps:.1f} | proc {process_fps.fps:.1f} | ui {ui_fps.fps:.1f} fps",
+                        (10, frame.shape[0] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+            cv2.imshow(WINDOW_NAME, frame)
+            metrics.observe("follow_me_render_ms", (time.perf_counter() - render_start) * 1000)
+            ui_fps.tick()
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
-        if exit_requested:
+        if exit_requested or (stop_requested is not None and stop_requested.is_set()):
             print("Exiting face tracking, returning to main program...")
-            threading.Thread(target=speak, args=("Thank you for using face tracking.",)).start()
+            speak(MSG_GOODBYE)
             check_and_send_command('s')
             exit_requested = False
             break
 
-    cap.release()
-    cv2.destroyAllWindows()
-
 
 if __name__ == "__main__":
-    main()
+    import sys
+    main(record_path=sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,174 @@
+import argparse
+import os
+import random
+import select
+import threading
+import time
+import tty
+from collections import deque
+import serial_protocol
+
+# --- CONFIGURATION ---
+BAUDRATE = 9600
+RX_BUFFER = 64           # Bytes the Arduino's hardware serial buffer holds
+PROCESS_MS = 2.0         # Time the sketch's loop() spends acting on one command
+# ---------------------
+
+
+class ArduinoSimulator:
+    """
+    Stands in for one Arduino on a pseudo-terminal (Linux/macOS). Open
+    `port` with pyserial like a real device. Bytes are delivered at the
+    baud rate, held in a RX_BUFFER-byte receive buffer (overflowing bytes are
+    dropped, as on the board) and consumed one command per PROCESS_MS.
+
+    framed=True speaks serial_protocol frames and answers with acks/naks;
+    framed=False accepts bare command characters like the current sketches.
+    corrupt_rate randomly flips a byte to exercise checksums and loss tracking.
+    """
+
+    def __init__(self, name, commands, framed=True, baudrate=BAUDRATE, rx_buffer=RX_BUFFER,
+                 process_ms=PROCESS_MS, corrupt_rate=0.0):
+        self.name = name
+        self.commands = frozenset(commands)
+        self.framed = framed
+        self.byte_time = 10.0 / baudrate   # 8N1: ten bits on the wire per byte
+        self.rx_buffer = rx_buffer
+        self.process_time = process_ms / 1000.0
+        self.corrupt_rate = corrupt_rate
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)  # No line discipline: 0x03 must not become Ctrl-C
+        self.port = os.ttyname(self.slave)
+        self.received = []       # Commands executed, in order
+        self.overflowed = 0      # Bytes dropped because the buffer was full
+        self.corrupted = 0
+        self._rx = deque()
+        self._running = False
+        self._threads = []
+
+    def start(self):
+        self._running = True
+        for target in (self._wire_loop, self._sketch_loop):
+            thread = threading.Thread(target=target, name=f"sim-{self.name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._running = False
+        for thread in self._threads:
+            thread.join(timeout=1)
+        os.close(self.master)
+        os.close(self.slave)
+
+    def _wire_loop(self):
+        """Moves bytes from the host into the receive buffer at the baud rate."""
+        while self._running:
+            ready, _, _ = select.select([self.master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self.master, 256)
+            except OSError:
+                return
+            for byte in data:
+                time.sleep(self.byte_time)
+                if self.corrupt_rate and random.random() < self.corrupt_rate:
+                    byte ^= 0x40
+                    self.corrupted += 1
+                if len(self._rx) >= self.rx_buffer:
+                    self.overflowed += 1
+                    continue
+                self._rx.append(byte)
+
+    def _sketch_loop(self):
+        """The sketch: takes commands out of the buffer and acknowledges them."""
+        parser = serial_protocol.FrameParser()
+        overflow_reported = 0
+        while self._running:
+            if not self._rx:
+                time.sleep(0.001)
+                continue
+            data = bytes(self._rx.popleft() for _ in range(len(self._rx)))
+            if not self.framed:
+                for byte in data:
+                    self._execute(chr(byte))
+                continue
+            for seq, kind, value, valid in parser.feed(data):
+                if kind not in (serial_protocol.KIND_COMMAND, serial_protocol.KIND_COMMAND_NO_ACK):
+                    continue
+                wants_ack = kind == serial_protocol.KIND_COMMAND
+                if not valid:
+                    reply = serial_protocol.encode_frame(seq, serial_protocol.KIND_NAK, serial_protocol.NAK_CHECKSUM)
+                elif chr(value) not in self.commands:
+                    reply = serial_protocol.encode_frame(seq, serial_protocol.KIND_NAK, serial_protocol.NAK_UNKNOWN)
+                else:
+                    self._execute(chr(value))
+                    if self.overflowed > overflow_reported:
+                        overflow_reported = self.overflowed
+                        reply = serial_protocol.encode_frame(seq, serial_protocol.KIND_NAK, serial_protocol.NAK_OVERFLOW)
+                    else:
+                        reply = serial_protocol.encode_frame(seq, serial_protocol.KIND_ACK, 0)
+                if wants_ack:
+                    self._reply(reply)
+
+    def _execute(self, command):
+        time.sleep(self.process_time)
+        self.received.append(command)
+
+    def _reply(self, frame):
+        try:
+            os.write(self.master, frame)
+        except OSError:
+            pass
+
+
+def load_test(count, rate, corrupt_rate):
+    """Sends `count` framed motor commands at `rate`/s through SerialDevice and prints RTT and loss."""
+    import serial_bus
+    serial_bus.SETTLE_TIME = 0
+    sim = ArduinoSimulator("motor", serial_protocol.MOTOR_COMMANDS, corrupt_rate=corrupt_rate).start()
+    device = serial_bus.SerialDevice("motor-sim", sim.port, protocol="framed", queue_size=count)
+    device.start()
+    commands = sorted(serial_protocol.MOTOR_COMMANDS - {'s'})
+    start = time.perf_counter()
+    for i in range(count):
+        device.send(commands[i % len(commands)])
+        time.sleep(1.0 / rate)
+    while device.queue_depth() and time.perf_counter() - start < count / rate + 10:
+        time.sleep(0.05)
+    time.sleep(serial_protocol.ACK_TIMEOUT * 2)  # Let the last acks arrive or expire
+    device.link.expire()
+    stats = device.link.stats()
+    print(f"Sent {stats['sent']} frames in {time.perf_counter() - start:.1f}s; executed {len(sim.received)}, "
+          f"acked {stats['acked']}, lost {stats['lost']}, naks {stats['naks']}; "
+          f"RTT p50 {stats['rtt_p50_ms']} ms, p99 {stats['rtt_p99_ms']} ms; "
+          f"simulator overflowed {sim.overflowed} bytes, corrupted {sim.corrupted}")
+    device.stop()
+    sim.stop()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pseudo-terminal Arduino simulator for the motor and face links.")
+    parser.add_argument("--raw", action="store_true", help="accept bare characters instead of frames")
+    parser.add_argument("--load", type=int, metavar="N", help="run a load test of N motor commands and exit")
+    parser.add_argument("--rate", type=float, default=50, help="commands per second for --load")
+    parser.add_argument("--corrupt", type=float, default=0.0, help="probability of corrupting each byte")
+    args = parser.parse_args()
+
+    if args.load:
+        load_test(args.load, args.rate, args.corrupt)
+    else:
+        motor = ArduinoSimulator("motor", serial_protocol.MOTOR_COMMANDS, framed=not args.raw).start()
+        face = ArduinoSimulator("face", serial_protocol.FACE_COMMANDS, framed=not args.raw).start()
+        mode = "raw" if args.raw else "framed"
+        print(f"Simulating motor on {motor.port} and face on {face.port} ({mode}). Start the server with:")
+        print(f"  MOTOR_SERIAL_PORT={motor.port} FACE_SERIAL_PORT={face.port} SERIAL_PROTOCOL={mode} python server.py")
+        try:
+            while True:
+                time.sleep(5)
+                print(f"motor executed {len(motor.received)}, face executed {len(face.received)}")
+        except KeyboardInterrupt:
+            motor.stop()
+            face.stop()
@@ -0,0 +1,110 @@
+import cv2
+import threading
+import time
+from concurrent.futures import Future
+import metrics
+
+# --- CONFIGURATION ---
+BATCH_SIZE = 8          # Max frames per forward() call
+MAX_WAIT_MS = 10        # How long the first frame waits for others to join
+INPUT_SIZE = (300, 300)
+MEAN = (104.0, 177.0, 123.0)
+# ---------------------
+
+
+class BatchInferenceEngine:
+    """
+    Shared SSD inference worker. Frames submitted from any thread are
+    collected for up to max_wait_ms (or until batch_size is reached) and run
+    through a single blobFromImages + forward() call. Each caller gets back
+    the detections for its own frame, shaped (1, 1, N, 7) like net.forward().
+    """
+
+    def __init__(self, net, batch_size=BATCH_SIZE, max_wait_ms=MAX_WAIT_MS,
+                 input_size=INPUT_SIZE, mean=MEAN, net_lock=None):
+        self.net = net
+        self.net_lock = net_lock or threading.Lock()  # Shared with other users of `net`
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.input_size = input_size
+        self.mean = mean
+        self.batches = 0
+        self.frames = 0
+        self._pending = []
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._worker_loop, name="batch-inference", daemon=True)
+        self._thread.start()
+
+    def submit(self, frame):
+        """Queues a BGR frame and returns a Future resolving to its detections."""
+        future = Future()
+        resized = cv2.resize(frame, self.input_size)
+        with self._cond:
+            self._pending.append((resized, future))
+            self._cond.notify()
+        return future
+
+    def detect(self, frame, timeout=None):
+        """Blocking helper: submit a frame and wait for its detections."""
+        return self.submit(frame).result(timeout)
+
+    def close(self):
+        """Stops the worker thread once pending frames have been served."""
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=2)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "batches": self.batches,
+                "frames": self.frames,
+                "avg_batch_size": self.frames / self.batches if self.batches else 0.0,
+                "pending": len(self._pending),
+            }
+
+    def _next_batch(self):
+        with self._cond:
+            while self._running and not self._pending:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            # Give other clients a short window to join this batch
+            deadline = time.monotonic() + self.max_wait
+            while len(self._pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._pending[:self.batch_size]
+            del self._pending[:self.batch_size]
+            return batch
+
+    def _worker_loop(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            images = [resized for resized, _ in batch]
+            try:
+                with metrics.timer("dnn_blob_ms"):
+                    blob = cv2.dnn.blobFromImages(images, 1.0, self.input_size, self.mean)
+                with self.net_lock, metrics.timer("dnn_forward_ms"):
+                    self.net.setInput(blob)
+                    detections = self.net.forward()
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            # The SSD output stacks every image's boxes; column 0 is the image index
+            image_ids = detections[0, 0, :, 0]
+            for index, (_, future) in enumerate(batch):
+                future.set_result(detections[:, :, image_ids == index, :])
+
+            with self._cond:
+                self.batches += 1
+                self.frames += len(batch)
+            metrics.observe("dnn_batch_size", len(batch))
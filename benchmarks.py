@@ -0,0 +1,282 @@
+"""
+End-to-end benchmarks for the vision and control hot paths.
+
+    python benchmarks.py                       # everything, synthetic frames
+    python benchmarks.py --quick               # shorter runs
+    python benchmarks.py --only detect track   # a subset
+    python benchmarks.py --recording recordings/demo --compare bench_results/old.json
+
+Results (p50/p99 latency, frames per second) are written as JSON to
+bench_results/<timestamp>-<commit>.json so runs can be compared across commits.
+"""
+import argparse
+import base64
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+
+import cv2
+import numpy as np
+import metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- CONFIGURATION ---
+RESULTS_DIR = os.path.join(BASE_DIR, "bench_results")
+FRAME_SIZE = (640, 480)
+DETECT_INPUT_SIZES = ((300, 300), (240, 240), (160, 160))
+TRACKER_TYPES = ("csrt", "kcf", "mosse")
+CLIENT_COUNTS = (1, 2, 4, 8)
+# ---------------------
+
+
+def synthetic_frames(count, size=FRAME_SIZE, seed=0):
+    """Noise background with a textured patch that drifts right, so trackers have something to follow."""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+    patch = rng.integers(0, 255, (120, 100, 3), dtype=np.uint8)
+    frames = []
+    for i in range(count):
+        frame = background.copy()
+        x = 100 + (i * 3) % (size[0] - 220)
+        frame[180:300, x:x + 100] = patch
+        frames.append(frame)
+    return frames
+
+
+def load_frames(recording, count):
+    if recording is None:
+        return synthetic_frames(count)
+    from session_recording import Recording
+    frames = [frame for _, _, frame in Recording(recording).frames()][:count]
+    if not frames:
+        raise SystemExit(f"No frames in recording {recording}")
+    return frames
+
+
+def _rate(samples_ms):
+    total = sum(samples_ms)
+    return round(len(samples_ms) * 1000.0 / total, 2) if total else None
+
+
+def bench_detect(frames, runs):
+    """detect_faces_dnn at several detector input sizes."""
+    import model_registry
+    import Follow_me_function as fm
+    results = {}
+    for input_size in DETECT_INPUT_SIZES:
+        engine = model_registry.get_engine(input_size=input_size)
+        samples = []
+        for i in range(runs):
+            start = time.perf_counter()
+            fm.detect_faces_dnn(frames[i % len(frames)], engine)
+            samples.append((time.perf_counter() - start) * 1000)
+        results[f"{input_size[0]}x{input_size[1]}"] = {"latency_ms": metrics.summarize(samples),
+                                                       "fps": _rate(samples)}
+        print(f"detect {input_size[0]}x{input_size[1]}: {results[f'{input_size[0]}x{input_size[1]}']}")
+    return results
+
+
+def bench_track(frames, runs):
+    """track_face per tracker type (steering included, motor output discarded)."""
+    import Follow_me_function as fm
+    fm.load_detector()
+    saved = fm.TRACKER_TYPE, fm.command_sink
+    fm.command_sink = lambda command: None
+    results = {}
+    try:
+        for tracker_type in TRACKER_TYPES:
+            fm.TRACKER_TYPE = tracker_type
+            try:
+                tracker = fm.initialize_tracker(frames[0], (100, 180, 100, 120))
+            except RuntimeError as e:
+                print(f"track {tracker_type}: skipped ({e})")
+                continue
+            fm.steering.reset()
+            samples = []
+            for i in range(1, runs + 1):
+                frame = frames[i % len(frames)]
+                start = time.perf_counter()
+                fm.track_face(tracker, frame)
+                samples.append((time.perf_counter() - start) * 1000)
+            results[tracker_type] = {"latency_ms": metrics.summarize(samples), "fps": _rate(samples)}
+            print(f"track {tracker_type}: {results[tracker_type]}")
+    finally:
+        fm.TRACKER_TYPE, fm.command_sink = saved
+    return results
+
+
+def bench_process_image(frames, duration, client_counts):
+    """/process-image latency and sustained frame rate with 1..N concurrent clients."""
+    import follow_me
+    payloads = []
+    for frame in frames[:30]:
+        _, buffer = cv2.imencode(".jpg", frame)
+        payloads.append(json.dumps({"image": "data:image/jpeg;base64," + base64.b64encode(buffer).decode()}))
+
+    results = {}
+    for clients in client_counts:
+        latencies, dropped = [], [0]
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def client(client_id):
+            http = follow_me.app.test_client()
+            i = 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = http.post("/process-image", data=payloads[i % len(payloads)],
+                                     content_type="application/json",
+                                     headers={"X-Client-Id": f"bench-{clients}-{client_id}"})
+                elapsed = (time.perf_counter() - start) * 1000
+                with lock:
+                    if response.status_code == 200:
+                        latencies.append(elapsed)
+                    else:
+                        dropped[0] += 1
+                i += 1
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results[str(clients)] = {
+            "latency_ms": metrics.summarize(latencies),
+            "fps_total": round(len(latencies) / duration, 2),
+            "fps_per_client": round(len(latencies) / duration / clients, 2),
+            "dropped": dropped[0],
+        }
+        print(f"process-image x{clients}: {results[str(clients)]}")
+    return results
+
+
+def bench_serial(runs):
+    """
+    HTTP request until its byte arrives on a loop:// fake port: Flask
+    handler, JSON parsing, _send_serial_command and the serial writer.
+    Steering goes through /api/motor/command, the safety stop through
+    /api/command. The server's motor device is swapped for a bench device
+    with the same settings; server.start_services() is not called, so no
+    other port, animator or warm-up thread runs.
+    """
+    import serial_bus
+    import server
+    serial_bus.SETTLE_TIME = 0
+    motor = serial_bus.motor
+    device = serial_bus.SerialDevice("bench-motor", "loop://", protocol="raw",
+                                     state_commands=motor.state_commands, toggle_commands=motor.toggle_commands,
+                                     safety_commands=motor.safety_commands, default_priority=motor.default_priority)
+    device.start()
+    deadline = time.perf_counter() + 5
+    while not device.connected and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    if not device.connected:
+        device.stop()
+        print(f"serial: skipped (could not open {device.port})")
+        return {}
+
+    serial_bus.motor = serial_bus.DEVICES["motor"] = device
+    http = server.app.test_client()
+    results = {}
+    try:
+        # Alternate targets so steering commands are never coalesced
+        for name, url, keys in (("steering", "/api/motor/command", ['1', '2', '3', '4', '5']),
+                                ("stop", "/api/command", ['s'])):
+            request_ms, wire_ms = [], []
+            for i in range(runs):
+                start = time.perf_counter()
+                http.post(url, json={"command": keys[i % len(keys)]})
+                request_ms.append((time.perf_counter() - start) * 1000)
+                data = device.ser.read(1)  # loop:// hands the written byte straight back
+                if data:
+                    wire_ms.append((time.perf_counter() - start) * 1000)
+            results[name] = {"request_ms": metrics.summarize(request_ms),
+                             "request_to_wire_ms": metrics.summarize(wire_ms), "lost": runs - len(wire_ms)}
+            print(f"serial {name}: {results[name]}")
+    finally:
+        serial_bus.motor = serial_bus.DEVICES["motor"] = motor
+        device.stop()
+    return results
+
+
+def _commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(current, previous_path):
+    """Prints p50 changes against an earlier results file."""
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+
+    def walk(new, old, path):
+        if isinstance(new, dict) and isinstance(old, dict):
+            if "p50" in new and "p50" in old and old["p50"]:
+                change = (new["p50"] - old["p50"]) / old["p50"] * 100
+                print(f"{path}: p50 {old['p50']} -> {new['p50']} ms ({change:+.1f}%)")
+            for key in new:
+                if key in old:
+                    walk(new[key], old[key], f"{path}.{key}" if path else key)
+
+    print(f"Compared with {previous['meta']['commit']} ({previous_path}):")
+    walk(current["results"], previous["results"], "")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", nargs="+", choices=["detect", "track", "process_image", "serial"],
+                        help="run only these benchmarks")
+    parser.add_argument("--quick", action="store_true", help="fewer runs and shorter load phases")
+    parser.add_argument("--recording", help="use frames from a session recording instead of synthetic ones")
+    parser.add_argument("--clients", type=int, nargs="+", default=list(CLIENT_COUNTS),
+                        help="concurrent client counts for process_image")
+    parser.add_argument("--out", help="results file (default: bench_results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", metavar="FILE", help="print p50 changes against an earlier results file")
+    args = parser.parse_args()
+
+    runs = 30 if args.quick else 200
+    duration = 3 if args.quick else 10
+    selected = args.only or ["detect", "track", "process_image", "serial"]
+    frames = load_frames(args.recording, 60)
+
+    results = {}
+    if "detect" in selected:
+        results["detect"] = bench_detect(frames, runs)
+    if "track" in selected:
+        results["track"] = bench_track(frames, runs)
+    if "process_image" in selected:
+        results["process_image"] = bench_process_image(frames, duration, args.clients)
+    if "serial" in selected:
+        results["serial"] = bench_serial(runs)
+
+    commit = _commit()
+    output = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "platform": platform.platform(),
+            "frames": args.recording or "synthetic",
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    path = args.out or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=2)
+    print(f"Results written to {path}")
+    if args.compare:
+        compare(output, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,8 @@
-import serial
-import time
+import serial_bus
 
-ser = serial.Serial('Com12', 9600, timeout=1)  # Change COM6 to your Arduino's port
-time.sleep(2)  # Wait for' the serial connection to initialize
 
-def send_command(command):
+def send_command(command, priority=None):
+    """Queues a command for the face Arduino; the serial bus owns the port."""
     command_str = str(command)
     print(f"Sending command: {command_str}")
-    ser.write(command_str.encode())    # Send command to Arduino
\ No newline at end of file
+    return serial_bus.face.send(command_str, priority)
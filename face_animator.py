@@ -0,0 +1,234 @@
+import math
+import random
+import threading
+import time
+from collections import deque
+import metrics
+import serial_bus
+from eye_controll import send_command as eye_controll
+from serial_protocol import FACE_COMMANDS
+
+# --- CONFIGURATION ---
+TICK = 0.05              # Timer wheel resolution in seconds
+WHEEL_SLOTS = 256        # Slots per wheel revolution (12.8 s at TICK)
+IDLE_BLINK_MIN = 4.0     # Idle blinks come at a random interval in this range (seconds)
+IDLE_BLINK_MAX = 9.0
+MAX_QUEUED = 4           # Expressions waiting behind the current one
+
+# Named sequences: (seconds from start, face command) steps, and how long the
+# face is busy with it. Idle blinks falling inside that time are merged away.
+SEQUENCES = {
+    "blink": {"steps": [(0.0, 'B')], "hold": 0.4},
+    "double_blink": {"steps": [(0.0, 'B'), (0.5, 'B')], "hold": 0.9},
+    "happy": {"steps": [(0.0, 'H')], "hold": 3.0},
+    "reaction": {"steps": [(0.0, 'e')], "hold": 2.0},
+}
+
+# Face commands from the API (serial_protocol.FACE_MAP values) and the sequence that plays them
+SEQUENCE_FOR_COMMAND = {'B': "blink", 'H': "happy", 'e': "reaction"}
+# ---------------------
+
+
+class Timer:
+    __slots__ = ("callback", "cancelled")
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel: schedule() and cancel() are O(1), and one thread
+    advances the wheel every `tick` seconds and runs the callbacks that fall
+    due. Delays are rounded up to whole ticks.
+    """
+
+    def __init__(self, tick=TICK, slots=WHEEL_SLOTS):
+        self.tick = tick
+        self._slots = [[] for _ in range(slots)]  # of [rounds_left, Timer]
+        self._position = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self._running = False
+
+    def schedule(self, delay, callback):
+        ticks = max(1, math.ceil(delay / self.tick))
+        timer = Timer(callback)
+        with self._lock:
+            slot = (self._position + ticks) % len(self._slots)
+            self._slots[slot].append([(ticks - 1) // len(self._slots), timer])
+        return timer
+
+    def start(self):
+        with self._lock:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="timer-wheel", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        next_tick = time.monotonic()
+        while self._running:
+            next_tick += self.tick
+            delay = next_tick - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            with self._lock:
+                self._position = (self._position + 1) % len(self._slots)
+                due, waiting = [], []
+                for entry in self._slots[self._position]:
+                    if entry[0] > 0:
+                        entry[0] -= 1
+                        waiting.append(entry)
+                    else:
+                        due.append(entry[1])
+                self._slots[self._position] = waiting
+            for timer in due:
+                if timer.cancelled:
+                    continue
+                try:
+                    timer.callback()
+                except Exception as e:
+                    print(f"⚠️ Error in timer callback: {e}")
+
+
+def compile_sequences(sequences):
+    """Validates the face commands and sorts each sequence's steps once, at import."""
+    compiled = {}
+    for name, spec in sequences.items():
+        for _, command in spec["steps"]:
+            if command not in FACE_COMMANDS:
+                raise ValueError(f"Sequence '{name}' uses unknown face command '{command}'")
+        compiled[name] = (tuple(sorted(spec["steps"])), spec["hold"])
+    return compiled
+
+
+COMPILED_SEQUENCES = compile_sequences(SEQUENCES)
+
+
+class FaceAnimator:
+    """
+    The only writer of face commands. play() starts a named sequence at
+    once (cancelling the current one) or queues it behind the current one;
+    cancel() stops the current sequence and clears the queue. Idle blinks
+    come at random intervals, only while the face Arduino is connected, and
+    are merged away while an expression is playing.
+    """
+
+    def __init__(self, send=eye_controll, wheel=None, idle_min=IDLE_BLINK_MIN, idle_max=IDLE_BLINK_MAX,
+                 is_connected=lambda: serial_bus.face.connected, rng=None):
+        self.send = send
+        self.wheel = wheel if wheel is not None else TimerWheel()
+        self.idle_min = idle_min
+        self.idle_max = idle_max
+        self.is_connected = is_connected
+        self.rng = rng if rng is not None else random.Random()
+        self.current = None
+        self._timers = []          # Pending steps and end of the current sequence
+        self._generation = 0       # Bumped per started/cancelled sequence; stale callbacks compare it
+        self._queue = deque()
+        self._busy_until = 0.0
+        self._lock = threading.RLock()
+        self.played = 0
+        self.idle_blinks = 0
+        self.idle_merged = 0
+
+    def start(self):
+        self.wheel.start()
+        self._schedule_idle()
+
+    def play(self, name, queue=False):
+        """Plays sequence `name` now, or after the current one with queue=True. Returns "playing" or "queued"."""
+        if name not in COMPILED_SEQUENCES:
+            raise KeyError(f"Unknown face sequence '{name}'")
+        with self._lock:
+            if queue and self.current is not None:
+                if len(self._queue) >= MAX_QUEUED:
+                    self._queue.popleft()
+                self._queue.append(name)
+                return "queued"
+            self._cancel_current()
+            self._start(name, trigger="request")
+            return "playing"
+
+    def cancel(self):
+        """Stops the current sequence (its remaining steps are not sent) and clears the queue."""
+        with self._lock:
+            self._queue.clear()
+            self._cancel_current()
+
+    def _cancel_current(self):
+        self._generation += 1
+        for timer in self._timers:
+            timer.cancel()
+        self._timers = []
+        self.current = None
+        self._busy_until = 0.0
+
+    def _start(self, name, trigger):
+        steps, hold = COMPILED_SEQUENCES[name]
+        self._generation += 1
+        generation = self._generation
+        self.current = name
+        self._busy_until = time.monotonic() + hold
+        self._timers = []
+        for offset, command in steps:
+            if offset <= 0:
+                self.send(command)  # First frame goes out immediately
+            else:
+                self._timers.append(self.wheel.schedule(offset, lambda c=command: self._step(generation, c)))
+        self._timers.append(self.wheel.schedule(hold, lambda: self._finished(generation)))
+        self.played += 1
+        metrics.inc("face_animations_total", sequence=name, trigger=trigger)
+
+    def _step(self, generation, command):
+        with self._lock:
+            if generation == self._generation:  # Not superseded or cancelled meanwhile
+                self.send(command)
+
+    def _finished(self, generation):
+        with self._lock:
+            if generation != self._generation:
+                return  # A newer sequence owns the state (and the queue)
+            self.current = None
+            self._timers = []
+            if self._queue:
+                self._start(self._queue.popleft(), trigger="queued")
+
+    def _schedule_idle(self):
+        self.wheel.schedule(self.rng.uniform(self.idle_min, self.idle_max), self._idle)
+
+    def _idle(self):
+        with self._lock:
+            if self.current is not None or time.monotonic() < self._busy_until:
+                self.idle_merged += 1  # The face is already animating
+                metrics.inc("face_idle_merged_total")
+            elif self.is_connected():
+                self.idle_blinks += 1
+                self._start("blink", trigger="idle")
+        self._schedule_idle()
+
+    def status(self):
+        with self._lock:
+            return {
+                "current": self.current,
+                "queued": list(self._queue),
+                "busy_for": round(max(0.0, self._busy_until - time.monotonic()), 2),
+                "played": self.played,
+                "idle_blinks": self.idle_blinks,
+                "idle_merged": self.idle_merged,
+                "sequences": sorted(COMPILED_SEQUENCES),
+            }
+
+
+animator = FaceAnimator()
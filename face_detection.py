@@ -0,0 +1,117 @@
+import cv2
+import numpy as np
+
+# --- CONFIGURATION ---
+CONF_THRESHOLD = 0.5
+NMS_THRESHOLD = 0.4   # IoU above which overlapping boxes are merged
+ROI_MARGIN = 1.0      # Crop extends this many box widths/heights around the focus box
+FULL_SCAN_EVERY = 15  # In ROI mode, still scan the whole frame every N detections
+# ---------------------
+
+
+def postprocess(detections, frame_shape, conf_threshold=CONF_THRESHOLD, nms_threshold=NMS_THRESHOLD):
+    """
+    Turns raw SSD output (1, 1, N, 7) into face boxes for a frame of
+    `frame_shape`, without a Python loop over the N candidates.
+
+    Returns (boxes, scores): boxes is an int32 array of shape (K, 4) holding
+    (startX, startY, endX, endY) clipped to the frame, scores is float32 (K,),
+    sorted by descending score. Overlapping duplicates are removed with NMS.
+    """
+    h, w = frame_shape[:2]
+    rows = detections.reshape(-1, 7)
+    keep = rows[:, 2] > conf_threshold
+    if not np.any(keep):
+        return np.empty((0, 4), dtype=np.int32), np.empty((0,), dtype=np.float32)
+
+    scores = rows[keep, 2].astype(np.float32)
+    boxes = rows[keep, 3:7] * np.array([w, h, w, h], dtype=np.float32)
+    np.clip(boxes, 0, [w - 1, h - 1, w - 1, h - 1], out=boxes)
+    boxes = boxes.astype(np.int32)
+
+    # Drop boxes that collapsed to nothing after clipping
+    valid = (boxes[:, 2] > boxes[:, 0]) & (boxes[:, 3] > boxes[:, 1])
+    boxes, scores = boxes[valid], scores[valid]
+
+    if len(boxes) > 1 and nms_threshold is not None:
+        xywh = np.column_stack((boxes[:, :2], boxes[:, 2:] - boxes[:, :2]))
+        indices = cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), conf_threshold, nms_threshold)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        boxes, scores = boxes[indices], scores[indices]
+
+    order = np.argsort(-scores)
+    return boxes[order], scores[order]
+
+
+def to_xywh(boxes):
+    """(K, 4) corner boxes -> (K, 4) (x, y, w, h) boxes."""
+    return np.column_stack((boxes[:, :2], boxes[:, 2:] - boxes[:, :2]))
+
+
+def detect(engine, frame, conf_threshold=CONF_THRESHOLD, nms_threshold=NMS_THRESHOLD):
+    """Runs `frame` through a BatchInferenceEngine and post-processes the result."""
+    return postprocess(engine.detect(frame), frame.shape, conf_threshold, nms_threshold)
+
+
+def expand_box(box, frame_shape, margin=ROI_MARGIN):
+    """Grows a (startX, startY, endX, endY) box by `margin` of its size on each side, clipped."""
+    h, w = frame_shape[:2]
+    x1, y1, x2, y2 = [int(v) for v in box]
+    pad_x = int((x2 - x1) * margin)
+    pad_y = int((y2 - y1) * margin)
+    return max(0, x1 - pad_x), max(0, y1 - pad_y), min(w, x2 + pad_x), min(h, y2 + pad_y)
+
+
+def detect_in_roi(engine, frame, roi, conf_threshold=CONF_THRESHOLD, nms_threshold=NMS_THRESHOLD):
+    """Detects inside the (startX, startY, endX, endY) crop `roi`; boxes come back in frame coordinates."""
+    x1, y1, x2, y2 = roi
+    crop = frame[y1:y2, x1:x2]
+    if crop.size == 0:
+        return np.empty((0, 4), dtype=np.int32), np.empty((0,), dtype=np.float32)
+    boxes, scores = detect(engine, crop, conf_threshold, nms_threshold)
+    return boxes + np.array([x1, y1, x1, y1], dtype=np.int32), scores
+
+
+class FocusedDetector:
+    """
+    ROI-focused detection. While a face of interest is known, the detector
+    only sees a crop around it (more pixels on the target, fewer on the
+    background); the whole frame is scanned every `full_scan_every` calls,
+    when no focus is known, or when the crop comes back empty.
+    """
+
+    def __init__(self, engine, conf_threshold=CONF_THRESHOLD, roi_margin=ROI_MARGIN,
+                 full_scan_every=FULL_SCAN_EVERY):
+        self.engine = engine
+        self.conf_threshold = conf_threshold
+        self.roi_margin = roi_margin
+        self.full_scan_every = full_scan_every
+        self.last_box = None
+        self.calls_since_full_scan = 0
+        self.roi_scans = 0
+        self.full_scans = 0
+
+    def detect(self, frame, focus_box=None):
+        """
+        Returns (boxes, scores) like detect(). focus_box, as (startX, startY,
+        endX, endY), overrides the best box remembered from the last call.
+        """
+        focus = focus_box if focus_box is not None else self.last_box
+        self.calls_since_full_scan += 1
+        boxes = None
+        if focus is not None and self.calls_since_full_scan < self.full_scan_every:
+            roi = expand_box(focus, frame.shape, self.roi_margin)
+            boxes, scores = detect_in_roi(self.engine, frame, roi, self.conf_threshold)
+            self.roi_scans += 1
+            if len(boxes) == 0:
+                boxes = None  # Target left the crop; fall back to a full scan
+        if boxes is None:
+            boxes, scores = detect(self.engine, frame, self.conf_threshold)
+            self.calls_since_full_scan = 0
+            self.full_scans += 1
+        self.last_box = tuple(boxes[0]) if len(boxes) else None
+        return boxes, scores
+
+    def reset(self):
+        self.last_box = None
+        self.calls_since_full_scan = 0
@@ -2,21 +2,219 @@ import flask
 import numpy as np
 import cv2
 import base64
+import threading
 import time
+from collections import OrderedDict
+import model_registry
+import face_detection
+from motion_gate import MotionGate
+from tracking_pipeline import HybridTracker
+import metrics
 
 # Initialize the Flask application
 app = flask.Flask(__name__)
 
-# --- MODEL LOADING (remains the same) ---
-prototxt_path = "deploy.prototxt"
-caffe_model_path = "res10_300x300_ssd_iter_140000.caffemodel"
-net = cv2.dnn.readNetFromCaffe(prototxt_path, caffe_model_path)
+# --- MODEL LOADING (shared, warmed-up network from model_registry) ---
+DNN_BACKEND = model_registry.DEFAULT_BACKEND
+DNN_TARGET = model_registry.DEFAULT_TARGET
+DETECT_INPUT_SIZE = model_registry.DEFAULT_INPUT_SIZE
+# Frames from concurrent sessions are batched into one forward() call
+inference_engine = model_registry.get_engine(backend=DNN_BACKEND, target=DNN_TARGET,
+                                             input_size=DETECT_INPUT_SIZE)
 
-# --- State Management Variables ---
-STATE = "SEARCHING"
-lock_start_time = None
-tracker = None # NEW: This will hold the CSRT tracker object
+# --- State Management (per client session, see TrackingSession) ---
 LOCK_DURATION = 3  # seconds
+SESSION_IDLE_TIMEOUT = 60  # seconds without frames before a session is freed
+MAX_SESSIONS = 8           # least recently used session is evicted beyond this
+TRACKER_TYPE = "csrt"      # "kcf" or "mosse" trade accuracy for CPU
+REDETECT_EVERY = 10        # Re-anchor the tracker on a fresh detection every N frames
+MOTION_GATING = True       # SEARCHING reuses the last detections while the scene is static
+ROI_DETECTION = True       # While locking/tracking, detect in a crop around the face
+DECODE_SCALE = 1           # 1, 2 or 4: decode uploads at 1/N resolution when full size is unnecessary
+DECODE_FLAGS = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4}
+METRICS_LOG_INTERVAL = 30  # Seconds between metrics summary lines (None to disable)
+
+# --- Transport statistics (bytes per frame and decode time, per transport) ---
+transport_stats = {
+    "json": {"frames": 0, "bytes_in": 0, "bytes_out": 0, "decode_ms": 0.0},
+    "binary": {"frames": 0, "bytes_in": 0, "bytes_out": 0, "decode_ms": 0.0},
+}
+transport_stats_lock = threading.Lock()  # Request threads update the counters concurrently
+
+# --- Admission control (one in-flight frame per client, newest frame wins) ---
+MAX_FPS = 15            # Never advertise more than this to clients
+ADMISSION_TIMEOUT = 2   # Seconds a queued frame may wait for the slot
+FPS_SMOOTHING = 0.2     # EMA weight of the newest processing time
+
+
+class AdmissionSlot:
+    """
+    One in-flight slot per client. A frame that arrives while another is
+    being processed waits; if an even newer frame arrives meanwhile, the
+    waiting one is dropped, so at most one frame is ever queued.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.busy = False
+        self.closed = False  # Set when the session is evicted
+        self.latest_ticket = 0
+        self.avg_ms = None
+        self.processed = 0
+        self.dropped = 0
+
+    def acquire(self, timeout=ADMISSION_TIMEOUT):
+        """Returns True when this frame may be processed, False if it went stale."""
+        with self.cond:
+            self.latest_ticket += 1
+            ticket = self.latest_ticket
+            self.cond.notify_all()  # Older waiters are now stale
+            deadline = time.monotonic() + timeout
+            while self.busy and ticket == self.latest_ticket:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.cond.wait(remaining)
+            if self.busy or self.closed or ticket != self.latest_ticket:
+                self.dropped += 1
+                metrics.inc("frames_dropped_total", stage="admission")
+                return False
+            self.busy = True
+            return True
+
+    def close(self):
+        """Closes an idle slot for eviction; returns False if a frame holds it."""
+        with self.cond:
+            if self.busy:
+                return False
+            self.closed = True
+            self.latest_ticket += 1  # Waiting frames go stale
+            self.cond.notify_all()
+            return True
+
+    def release(self, elapsed_ms):
+        metrics.observe("frame_total_ms", elapsed_ms)
+        metrics.inc("frames_processed_total")
+        with self.cond:
+            self.busy = False
+            self.processed += 1
+            if self.avg_ms is None:
+                self.avg_ms = elapsed_ms
+            else:
+                self.avg_ms += FPS_SMOOTHING * (elapsed_ms - self.avg_ms)
+            self.cond.notify_all()
+
+    def target_fps(self):
+        """Frame rate this client can currently be served at."""
+        if not self.avg_ms:
+            return MAX_FPS
+        return round(min(MAX_FPS, 1000.0 / self.avg_ms), 1)
+
+
+class TrackingSession:
+    """State machine, tracker and admission slot belonging to one client."""
+
+    def __init__(self, client_id):
+        self.client_id = client_id
+        self.state = "SEARCHING"
+        self.lock_start_time = None
+        self.tracker = None  # HybridTracker once the face is LOCKED
+        self.lock_box = None  # Face being locked on, focus of ROI detection
+        self.detector = face_detection.FocusedDetector(inference_engine, conf_threshold=0.5)
+        self.motion_gate = MotionGate(name="follow_me")
+        self.last_faces = None  # Detections reused while the motion gate is closed
+        self.slot = AdmissionSlot()
+        self.lock = threading.Lock()  # Guards state/tracker against /deselect
+        self.last_seen = time.monotonic()
+
+    def reset(self):
+        with self.lock:
+            self.state = "SEARCHING"
+            self.lock_start_time = None
+            self.tracker = None
+            self.lock_box = None
+            self.detector.reset()
+            self.motion_gate.reset()
+
+
+class SessionStore:
+    """
+    Thread-safe map of client id -> TrackingSession. Sessions idle longer
+    than idle_timeout are freed, and beyond max_sessions the least recently
+    used one is evicted, so abandoned trackers do not pile up.
+    """
+
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_timeout=SESSION_IDLE_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.evicted = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, client_id):
+        """Returns the client's session, creating it if needed, and marks it used."""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(client_id)
+            if session is None:
+                session = self._sessions[client_id] = TrackingSession(client_id)
+                print(f"New tracking session for client {client_id}")
+                self._evict_lru(keep=client_id)
+            else:
+                self._sessions.move_to_end(client_id)
+            session.last_seen = now
+            return session
+
+    def peek(self, client_id):
+        with self._lock:
+            return self._sessions.get(client_id)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def _evict_idle(self, now):
+        # Oldest first; stop at the first session that is still fresh
+        for client_id, session in list(self._sessions.items()):
+            if now - session.last_seen < self.idle_timeout:
+                break
+            self._drop(client_id)
+
+    def _evict_lru(self, keep):
+        """Evicts idle sessions oldest-first, never the one `keep` was just created for."""
+        for client_id in list(self._sessions):
+            if len(self._sessions) <= self.max_sessions:
+                break
+            if client_id != keep:
+                self._drop(client_id)
+
+    def _drop(self, client_id):
+        """Drops a session unless a frame is being processed on it."""
+        session = self._sessions[client_id]
+        if not session.slot.close():
+            return
+        del self._sessions[client_id]
+        with session.lock:
+            session.tracker = None  # Free the tracker now
+        self.evicted += 1
+        print(f"Evicted tracking session for client {client_id}")
+
+
+sessions = SessionStore()
+metrics.register_gauge_fn(lambda: [("tracking_sessions", {}, len(sessions))])
+
+def get_client_id():
+    """Clients identify themselves with X-Client-Id; fall back to their address."""
+    return flask.request.headers.get("X-Client-Id") or flask.request.remote_addr
+
+def dropped_response(session):
+    """429 for a frame superseded by a newer one from the same client."""
+    target_fps = session.slot.target_fps()
+    response = flask.jsonify({"dropped": True, "state": session.state, "target_fps": target_fps})
+    response.status_code = 429
+    response.headers["X-Target-Fps"] = str(target_fps)
+    return response
 
 @app.route("/")
 def index():
@@ -24,109 +222,311 @@ def index():
 
 @app.route("/deselect", methods=["POST"])
 def deselect():
-    """Resets the state back to SEARCHING."""
-    global STATE, lock_start_time, tracker
-    STATE = "SEARCHING"
-    lock_start_time = None
-    tracker = None # Reset the tracker object
-    print("State reset to SEARCHING")
+    """Resets the calling client's session back to SEARCHING."""
+    session = sessions.peek(get_client_id())
+    if session is not None:
+        session.reset()  # Also drops the tracker object
+    print(f"State reset to SEARCHING for client {get_client_id()}")
     return flask.jsonify({"status": "reset successful"})
 
+def record_transport(transport, bytes_in, bytes_out, decode_ms):
+    with transport_stats_lock:
+        stats = transport_stats[transport]
+        stats["frames"] += 1
+        stats["bytes_in"] += bytes_in
+        stats["bytes_out"] += bytes_out
+        stats["decode_ms"] += decode_ms
+
+@app.route("/transport-stats")
+def get_transport_stats():
+    """Average bytes per frame and decode time for each transport."""
+    with transport_stats_lock:
+        snapshot = {transport: dict(stats) for transport, stats in transport_stats.items()}
+    summary = {}
+    for transport, stats in snapshot.items():
+        frames = max(stats["frames"], 1)
+        summary[transport] = {
+            "frames": stats["frames"],
+            "avg_bytes_in": stats["bytes_in"] / frames,
+            "avg_bytes_out": stats["bytes_out"] / frames,
+            "avg_decode_ms": stats["decode_ms"] / frames,
+        }
+    return flask.jsonify(summary)
+
+@app.route("/inference-stats")
+def get_inference_stats():
+    """Batches run by the shared inference engine, and the loaded models."""
+    return flask.jsonify({"engine": inference_engine.stats(), "models": model_registry.status()})
+
+@app.route("/metrics")
+def get_metrics():
+    """Prometheus-style latency histograms, frame counters and gauges."""
+    return flask.Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/sessions")
+def get_sessions():
+    """Number of live tracking sessions and how many have been evicted."""
+    return flask.jsonify({"sessions": len(sessions), "evicted": sessions.evicted})
+
 @app.route("/process-image", methods=["POST"])
 def process_image():
-    global STATE, lock_start_time, tracker
-    
+    """Legacy transport: base64 JPEG data URL in, base64 data URL out (JSON)."""
+    session = sessions.get(get_client_id())
+    if not session.slot.acquire():
+        return dropped_response(session)
+    start = time.perf_counter()
+    try:
+        response = _process_image_json(session, start)
+    finally:
+        session.slot.release((time.perf_counter() - start) * 1000)
+    response.headers["X-Target-Fps"] = str(session.slot.target_fps())
+    return response
+
+def _process_image_json(session, start):
     data = flask.request.get_json()
-    image_data_url = data['image']
-    header, encoded_data = image_data_url.split(',', 1)
-    decoded_image = base64.b64decode(encoded_data)
+    mode = data.get('mode') or flask.request.args.get('mode', 'annotated')
+    try:
+        header, encoded_data = data['image'].split(',', 1)
+        decoded_image = base64.b64decode(encoded_data)
+    except (KeyError, AttributeError, ValueError):  # binascii.Error is a ValueError
+        decoded_image = b""
     nparr = np.frombuffer(decoded_image, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+    img = cv2.imdecode(nparr, DECODE_FLAGS[DECODE_SCALE]) if nparr.size else None
+    decode_ms = (time.perf_counter() - start) * 1000
+    metrics.observe("frame_decode_ms", decode_ms, transport="json")
+    if img is None:
+        response = flask.jsonify({"error": "image is not a decodable data URL"})
+        response.status_code = 400
+        return response
+
+    state_start = time.perf_counter()
+    with session.lock, metrics.timer("frame_state_machine_ms"):
+        result = run_state_machine(session, img)
+    state_ms = (time.perf_counter() - state_start) * 1000
+
+    if mode == "overlay":
+        # Client already has the frame: send only the structured result
+        payload = overlay_payload(result, {"decode_ms": decode_ms, "process_ms": state_ms})
+        payload["target_fps"] = session.slot.target_fps()
+        response = flask.jsonify(payload)
+        record_transport("json", flask.request.content_length or 0, response.content_length or 0, decode_ms)
+        return response
+
+    draw_overlay(img, result)
+    with metrics.timer("frame_encode_ms", transport="json"):
+        _, buffer = cv2.imencode('.jpg', img)
+    processed_image_b64 = base64.b64encode(buffer).decode('utf-8')
+    processed_image_data_url = f"data:image/jpeg;base64,{processed_image_b64}"
+    response = flask.jsonify({
+        "processed_image": processed_image_data_url,
+        "state": session.state,
+        "target_fps": session.slot.target_fps()
+    })
+    record_transport("json", flask.request.content_length or 0, response.content_length or 0, decode_ms)
+    return response
+
+@app.route("/process-frame", methods=["POST"])
+def process_frame():
+    """
+    Binary transport: raw image/jpeg body in, raw image/jpeg body out.
+    The state travels in the X-State header, so no base64 either way.
+    With ?mode=overlay the response is the JSON overlay result instead of an image.
+    """
+    raw = flask.request.get_data()
+    session = sessions.get(get_client_id())
+    if not session.slot.acquire():
+        return dropped_response(session)
+    start = time.perf_counter()
+    try:
+        response = _process_frame_binary(session, raw)
+    finally:
+        session.slot.release((time.perf_counter() - start) * 1000)
+    response.headers["X-Target-Fps"] = str(session.slot.target_fps())
+    return response
+
+def _process_frame_binary(session, raw):
+    start = time.perf_counter()
+    # np.frombuffer wraps the request bytes without copying them
+    img = cv2.imdecode(np.frombuffer(raw, np.uint8), DECODE_FLAGS[DECODE_SCALE]) if raw else None
+    decode_ms = (time.perf_counter() - start) * 1000
+    metrics.observe("frame_decode_ms", decode_ms, transport="binary")
+    if img is None:
+        response = flask.jsonify({"error": "body is not a decodable image"})
+        response.status_code = 400
+        return response
+
+    state_start = time.perf_counter()
+    with session.lock, metrics.timer("frame_state_machine_ms"):
+        result = run_state_machine(session, img)
+    state_ms = (time.perf_counter() - state_start) * 1000
+
+    if flask.request.args.get("mode") == "overlay":
+        # Client already has the frame: skip JPEG encoding and the image downlink
+        response = flask.jsonify(overlay_payload(result, {"decode_ms": decode_ms, "process_ms": state_ms}))
+        record_transport("binary", len(raw), response.content_length or 0, decode_ms)
+        response.headers["X-State"] = session.state
+        return response
 
+    draw_overlay(img, result)
+    with metrics.timer("frame_encode_ms", transport="binary"):
+        _, buffer = cv2.imencode('.jpg', img)
+    record_transport("binary", len(raw), buffer.nbytes, decode_ms)
+    response = flask.Response(buffer.tobytes(), mimetype="image/jpeg")
+    response.headers["X-State"] = session.state
+    response.headers["X-Decode-Ms"] = f"{decode_ms:.2f}"
+    return response
+
+def detect_faces(img, session=None, focus_box=None):
+    """
+    Face boxes as an (N, 4) array of (startX, startY, endX, endY), after NMS.
+    With ROI_DETECTION and a focus_box, the session's FocusedDetector only
+    searches a crop around it (with periodic full-frame scans).
+    """
+    # Detection runs on the shared engine, batched with other sessions' frames
+    if ROI_DETECTION and session is not None and focus_box is not None:
+        boxes, _ = session.detector.detect(img, focus_box)
+    else:
+        boxes, _ = face_detection.detect(inference_engine, img, conf_threshold=0.5)
+    return boxes
+
+def detect_faces_xywh(img, session=None, focus_box=None):
+    """Same detections as (x, y, w, h), the format trackers use; focus_box is (x, y, w, h) too."""
+    if focus_box is not None:
+        x, y, w, h = focus_box
+        focus_box = (x, y, x + w, y + h)
+    return face_detection.to_xywh(detect_faces(img, session, focus_box))
+
+def run_state_machine(session, img):
+    """
+    Runs detection/tracking for one session on a decoded frame. Returns the
+    structured result (boxes as [startX, startY, endX, endY] in frame pixels);
+    draw_overlay() renders it when an annotated image is wanted.
+    """
     (h, w) = img.shape[:2]
 
-    # Define the central selection box
-    select_w, select_h = 150, 200
+    # Define the central selection box (sized for a full-resolution frame)
+    select_w, select_h = 150 // DECODE_SCALE, 200 // DECODE_SCALE
     select_x = (w - select_w) // 2
     select_y = (h - select_h) // 2
     selection_box = (select_x, select_y, select_x + select_w, select_y + select_h)
 
-    if STATE == "SEARCHING" or STATE == "LOCKING":
-        # Face detection logic remains the same
-        blob = cv2.dnn.blobFromImage(cv2.resize(img, (300, 300)), 1.0, (300, 300), (104.0, 177.0, 123.0))
-        net.setInput(blob)
-        detections = net.forward()
-        all_faces = []
-        for i in range(0, detections.shape[2]):
-            confidence = detections[0, 0, i, 2]
-            if confidence > 0.5:
-                box = detections[0, 0, i, 3:7] * np.array([w, h, w, h])
-                all_faces.append(box.astype("int"))
-
-        if STATE == "SEARCHING":
-            cv2.rectangle(img, (selection_box[0], selection_box[1]), (selection_box[2], selection_box[3]), (0, 0, 255), 2)
+    result = {
+        "phase": session.state,  # State this frame was processed in
+        "selection_box": selection_box,
+        "faces": [],
+        "tracked_box": None,
+        "lock_elapsed": None,
+    }
+
+    if session.state == "SEARCHING" or session.state == "LOCKING":
+        # SEARCHING scans the whole frame, skipping static scenes; LOCKING focuses on the face being locked
+        if session.state == "LOCKING":
+            all_faces = detect_faces(img, session, session.lock_box)
+            session.last_faces = None
+        elif not MOTION_GATING or session.motion_gate.needs_detection(img) or session.last_faces is None:
+            all_faces = detect_faces(img)
+            session.last_faces = all_faces
+        else:
+            all_faces = session.last_faces
+        result["faces"] = all_faces
+
+        if session.state == "SEARCHING":
             face_in_box = False
             for (startX, startY, endX, endY) in all_faces:
-                cv2.rectangle(img, (startX, startY), (endX, endY), (0, 255, 0), 2)
                 face_center_x = (startX + endX) // 2
                 face_center_y = (startY + endY) // 2
                 if selection_box[0] < face_center_x < selection_box[2] and selection_box[1] < face_center_y < selection_box[3]:
                     face_in_box = True
+                    session.lock_box = (startX, startY, endX, endY)
             if face_in_box:
-                STATE = "LOCKING"
-                lock_start_time = time.time()
+                session.state = "LOCKING"
+                session.lock_start_time = time.time()
 
-        elif STATE == "LOCKING":
-            elapsed_time = time.time() - lock_start_time
-            cv2.rectangle(img, (selection_box[0], selection_box[1]), (selection_box[2], selection_box[3]), (0, 255, 255), 2)
-            cv2.putText(img, f"Locking... {int(elapsed_time)}s", (selection_box[0], selection_box[1] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+        elif session.state == "LOCKING":
+            elapsed_time = time.time() - session.lock_start_time
+            result["lock_elapsed"] = elapsed_time
             face_in_box = False
             potential_tracked_box = None
             for (startX, startY, endX, endY) in all_faces:
-                cv2.rectangle(img, (startX, startY), (endX, endY), (0, 255, 0), 2)
                 face_center_x = (startX + endX) // 2
                 face_center_y = (startY + endY) // 2
                 if selection_box[0] < face_center_x < selection_box[2] and selection_box[1] < face_center_y < selection_box[3]:
                     face_in_box = True
                     potential_tracked_box = (startX, startY, endX, endY)
             if not face_in_box:
-                STATE = "SEARCHING"
-                lock_start_time = None
+                session.state = "SEARCHING"
+                session.lock_start_time = None
+                session.lock_box = None
             elif elapsed_time >= LOCK_DURATION:
-                STATE = "LOCKED"
-                # --- NEW: Initialize the CSRT Tracker ---
+                session.state = "LOCKED"
+                # --- Initialize the tracker (re-anchored by periodic detections) ---
                 (x1, y1, x2, y2) = potential_tracked_box
                 face_box_wh = (x1, y1, x2 - x1, y2 - y1) # Convert to (x, y, w, h)
-                tracker = cv2.TrackerCSRT_create()
-                tracker.init(img, face_box_wh)
+                session.tracker = HybridTracker(lambda f, box: detect_faces_xywh(f, session, box),
+                                                tracker_type=TRACKER_TYPE,
+                                                redetect_every=REDETECT_EVERY)
+                session.tracker.init(img, face_box_wh)
+            else:
+                session.lock_box = potential_tracked_box
 
-    # --- State: LOCKED (Completely new CSRT tracking logic) ---
-    elif STATE == "LOCKED":
-        if tracker is None:
-            STATE = "SEARCHING" # Safety check
+    # --- State: LOCKED (tracker with periodic re-detection) ---
+    elif session.state == "LOCKED":
+        if session.tracker is None:
+            session.state = "SEARCHING" # Safety check
         else:
             # Update the tracker
-            success, bbox = tracker.update(img)
+            with metrics.timer("tracker_update_ms", tracker=TRACKER_TYPE):
+                success, bbox = session.tracker.update(img)
             
             if success:
-                # Draw the bounding box
                 (x, y, w, h) = [int(v) for v in bbox]
-                cv2.rectangle(img, (x, y), (x + w, y + h), (255, 0, 0), 2)
-                cv2.putText(img, "LOCKED (CSRT)", (x, y - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+                result["tracked_box"] = (x, y, x + w, y + h)
             else:
                 # If tracking fails, go back to searching for a new face
-                print("CSRT tracking failed.")
-                STATE = "SEARCHING"
-                tracker = None
+                print("Tracking failed.")
+                session.state = "SEARCHING"
+                session.tracker = None
 
-    # --- Encode and send the final image and state ---
-    _, buffer = cv2.imencode('.jpg', img)
-    processed_image_b64 = base64.b64encode(buffer).decode('utf-8')
-    processed_image_data_url = f"data:image/jpeg;base64,{processed_image_b64}"
-    return flask.jsonify({
-        "processed_image": processed_image_data_url,
-        "state": STATE
-    })
+    result["state"] = session.state
+    return result
+
+def draw_overlay(img, result):
+    """Draws a run_state_machine() result onto the frame (annotated response mode)."""
+    selection_box = result["selection_box"]
+    if result["phase"] == "SEARCHING":
+        cv2.rectangle(img, (selection_box[0], selection_box[1]), (selection_box[2], selection_box[3]), (0, 0, 255), 2)
+    elif result["phase"] == "LOCKING":
+        cv2.rectangle(img, (selection_box[0], selection_box[1]), (selection_box[2], selection_box[3]), (0, 255, 255), 2)
+        cv2.putText(img, f"Locking... {int(result['lock_elapsed'])}s", (selection_box[0], selection_box[1] - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+    for (startX, startY, endX, endY) in result["faces"]:
+        cv2.rectangle(img, (startX, startY), (endX, endY), (0, 255, 0), 2)
+    if result["tracked_box"] is not None:
+        (x1, y1, x2, y2) = result["tracked_box"]
+        cv2.rectangle(img, (x1, y1), (x2, y2), (255, 0, 0), 2)
+        cv2.putText(img, f"LOCKED ({TRACKER_TYPE.upper()})", (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 0, 0), 2)
+    return img
+
+def overlay_payload(result, timing):
+    """JSON-ready overlay result in the client's (full-resolution) pixel coordinates."""
+    def scale(box):
+        return None if box is None else [int(v) * DECODE_SCALE for v in box]
+
+    lock_progress = None
+    if result["lock_elapsed"] is not None:
+        lock_progress = min(1.0, result["lock_elapsed"] / LOCK_DURATION)
+    return {
+        "state": result["state"],
+        "phase": result["phase"],
+        "selection_box": scale(result["selection_box"]),
+        "faces": [scale(box) for box in result["faces"]],
+        "tracked_box": scale(result["tracked_box"]),
+        "tracker": TRACKER_TYPE,
+        "lock_progress": lock_progress,
+        "lock_elapsed": result["lock_elapsed"],
+        "timing": {name: round(value, 2) for name, value in timing.items()},
+    }
 
 if __name__ == "__main__":
+    if METRICS_LOG_INTERVAL:
+        metrics.start_periodic_log(METRICS_LOG_INTERVAL)
     app.run(debug=True)
\ No newline at end of file
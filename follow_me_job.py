@@ -0,0 +1,88 @@
+import threading
+import time
+import warmup
+
+
+def load_follow_me():
+    """Imports the vision stack (OpenCV, TTS, DNN model) off the startup path."""
+    import Follow_me_function
+    Follow_me_function.warm_up()
+    return Follow_me_function
+
+
+class FollowMeJob:
+    """
+    Runs Follow_me_function.main() on a background thread so the HTTP API
+    stays responsive. Only one session may run at a time, because it owns
+    the camera and the tracking window.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_requested = None
+        self.state = "idle"      # idle | starting | running | stopping
+        self.started_at = None
+        self.finished_at = None
+        self.last_error = None
+
+    def start(self):
+        """Starts a session. Returns False if one is already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._stop_requested = threading.Event()
+            self.state = "starting"
+            self.started_at = time.time()
+            self.finished_at = None
+            self.last_error = None
+            self._thread = threading.Thread(target=self._run, args=(self._stop_requested,),
+                                            name="follow-me", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self, timeout=5):
+        """Asks the running session to exit and waits for camera/window teardown."""
+        with self._lock:
+            thread = self._thread
+            if thread is None or not thread.is_alive():
+                return False
+            self.state = "stopping"
+            self._stop_requested.set()
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def is_running(self):
+        with self._lock:
+            return self._thread is not None and self._thread.is_alive()
+
+    def status(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "running": self._thread is not None and self._thread.is_alive(),
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "last_error": self.last_error,
+            }
+
+    def _run(self, stop_requested):
+        try:
+            # The vision stack may still be warming up in the background. If an earlier
+            # warm-up failed (e.g. model files missing at boot), this starts a new attempt.
+            warmup.start_background("follow_me", load_follow_me)
+            Follow_me_function = warmup.wait_for("follow_me", timeout=60)
+            with self._lock:
+                if not stop_requested.is_set():
+                    self.state = "running"
+            if not stop_requested.is_set():
+                print("🚀 Follow Me session started.")
+                Follow_me_function.main(stop_requested)
+        except Exception as e:
+            print(f"❌ Follow Me session failed: {e}")
+            self.last_error = str(e)
+        finally:
+            with self._lock:
+                self.state = "idle"
+                self.finished_at = time.time()
+            print("Follow Me session ended.")
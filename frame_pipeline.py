@@ -0,0 +1,82 @@
+import threading
+import time
+from collections import deque
+
+
+class LatestSlot:
+    """
+    Single-slot queue: put() overwrites whatever is waiting, get() returns the
+    newest item. A slow consumer therefore never sees stale frames and never
+    stalls the producer. Overwritten items are counted as dropped.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        """Takes the newest item, waiting up to timeout. Returns None on timeout."""
+        with self._cond:
+            if self._item is None:
+                self._cond.wait(timeout)
+            item, self._item = self._item, None
+            return item
+
+
+class FpsCounter:
+    """Frame rate of one stage, averaged over a sliding window of ticks."""
+
+    def __init__(self, window=30):
+        self._times = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def tick(self):
+        with self._lock:
+            self._times.append(time.perf_counter())
+
+    @property
+    def fps(self):
+        with self._lock:
+            if len(self._times) < 2:
+                return 0.0
+            return (len(self._times) - 1) / (self._times[-1] - self._times[0])
+
+
+class CaptureThread(threading.Thread):
+    """
+    Grabs frames from an open cv2.VideoCapture as fast as the camera delivers
+    them and keeps only the newest one in `slot`. transform(frame) is applied
+    before publishing (e.g. the mirror flip).
+    """
+
+    def __init__(self, cap, slot, stop_event, transform=None):
+        super().__init__(name="capture", daemon=True)
+        self.cap = cap
+        self.slot = slot
+        self.stop_event = stop_event
+        self.transform = transform
+        self.fps = FpsCounter()
+        self.failed = False
+
+    def run(self):
+        while not self.stop_event.is_set():
+            ret, frame = self.cap.read()
+            if not ret:
+                print("Camera returned no frame, stopping capture.")
+                self.failed = True
+                self.stop_event.set()
+                break
+            if self.transform is not None:
+                frame = self.transform(frame)
+            self.slot.put(frame)
+            self.fps.tick()
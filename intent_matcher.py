@@ -0,0 +1,256 @@
+import csv
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter, deque
+import metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- CONFIGURATION ---
+# Sources in priority order: an earlier intent wins when several keys match
+INTENTS_FILE = os.path.join(BASE_DIR, "intents.json")
+QA_CSV_FILE = os.path.join(BASE_DIR, "questions.csv")
+QA_JSONL_FILE = os.path.join(BASE_DIR, "LLM Training", "My_data.jsonl")
+FUZZY_MIN_LENGTH = 5    # Keys shorter than this (cse, ece, ...) only match exactly
+FUZZY_MAX_RATIO = 0.2   # Allowed edit distance as a fraction of the key length
+# ---------------------
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    """Lower-case word tokens; apostrophes are dropped so "what's" == "whats"."""
+    return _TOKEN_RE.findall(text.lower().replace("'", "").replace("’", ""))
+
+
+def bigrams(text):
+    """Multiset of the character bigrams of `text`."""
+    return Counter(text[i:i + 2] for i in range(len(text) - 1))
+
+
+def _tokens(grams):
+    """A bigram multiset as distinct (bigram, occurrence) tokens, so repeats count separately."""
+    return [(gram, i) for gram, count in grams.items() for i in range(count)]
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 once it must exceed limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class Intent:
+    def __init__(self, name, keys, responses=(), url=None, action=None, priority=0):
+        self.name = name
+        self.keys = list(keys)
+        self.responses = list(responses)
+        self.url = url
+        self.action = action
+        self.priority = priority
+        self._next = 0
+
+    def next_response(self):
+        """Rotates through the responses like the old chat page did."""
+        if not self.responses:
+            return None
+        response = self.responses[self._next % len(self.responses)]
+        self._next += 1
+        return response
+
+
+class IntentMatcher:
+    """
+    Word-level Aho-Corasick automaton over every intent key. match() walks
+    the transcript once, so its cost grows with the transcript length, not
+    the number of intents; among all keys found, the highest-priority intent
+    wins. When nothing matches exactly, transcript windows are compared with
+    the longer keys by edit distance to catch misheard phrases; a bigram
+    prefix index picks the few keys worth comparing.
+    """
+
+    def __init__(self, intents):
+        self.intents = intents
+        self._goto = [{}]     # node -> {word: node}
+        self._fail = [0]
+        self._output = [[]]   # node -> [intent] for keys ending here
+        self._fuzzy_keys = []  # [(key text, intent, allowed distance, bigram tokens)]
+        self._prefix_index = {}  # word count -> {(bigram, occurrence): [fuzzy key index]}
+        self._length_range = {}  # word count -> (shortest, longest) window length worth checking
+        self._lock = threading.Lock()
+        for intent in intents:
+            for key in intent.keys:
+                self._add(normalize(key), intent)
+        self._build()
+
+    def _add(self, words, intent):
+        if not words:
+            return
+        node = 0
+        for word in words:
+            nxt = self._goto[node].get(word)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][word] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = nxt
+        self._output[node].append(intent)
+        text = " ".join(words)
+        limit = int(len(text) * FUZZY_MAX_RATIO)
+        if len(text) >= FUZZY_MIN_LENGTH and limit > 0:
+            self._fuzzy_keys.append((text, intent, limit, frozenset(_tokens(bigrams(text)))))
+
+    def _build(self):
+        # Breadth-first, so a node's failure link is final before its children need it
+        queue = deque(self._goto[0].values())  # Depth-1 nodes fail back to the root
+        while queue:
+            node = queue.popleft()
+            for word, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and word not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(word, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+        self._build_prefix_index()
+
+    def _build_prefix_index(self):
+        """
+        Prefix filter for the fuzzy pass. Each edit destroys at most two
+        bigrams, so a window within `limit` edits of a key shares all but
+        2 * limit of the key's bigrams, and therefore at least one of its
+        2 * limit + 1 rarest ones. Only those are indexed, so a window only
+        meets keys that share a rare bigram with it.
+        """
+        frequency = Counter()
+        for _, _, _, tokens in self._fuzzy_keys:
+            frequency.update(tokens)
+        for index, (text, _, limit, tokens) in enumerate(self._fuzzy_keys):
+            rarest = sorted(tokens, key=lambda token: (frequency[token], token))[:2 * limit + 1]
+            count = len(text.split(" "))
+            postings = self._prefix_index.setdefault(count, {})
+            for token in rarest:
+                postings.setdefault(token, []).append(index)
+            shortest, longest = self._length_range.get(count, (len(text) - limit, len(text) + limit))
+            self._length_range[count] = (min(shortest, len(text) - limit), max(longest, len(text) + limit))
+
+    def _exact(self, words):
+        best = None
+        node = 0
+        for word in words:
+            while node and word not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(word, 0)
+            for intent in self._output[node]:
+                if best is None or intent.priority < best.priority:
+                    best = intent
+        return best
+
+    def _fuzzy(self, words):
+        """
+        Edit distance is only computed for keys found through the prefix
+        index that also share at least max(len) - 1 - 2 * limit bigrams.
+        """
+        best, best_score = None, None
+        for count, postings in self._prefix_index.items():
+            shortest, longest = self._length_range[count]
+            for start in range(0, len(words) - count + 1):
+                window = " ".join(words[start:start + count])
+                if not shortest <= len(window) <= longest:
+                    continue
+                window_tokens = frozenset(_tokens(bigrams(window)))
+                candidates = {index for token in window_tokens for index in postings.get(token, ())}
+                for index in candidates:
+                    text, intent, limit, tokens = self._fuzzy_keys[index]
+                    if abs(len(window) - len(text)) > limit or \
+                            len(window_tokens & tokens) < max(len(window), len(text)) - 1 - 2 * limit:
+                        continue
+                    distance = edit_distance(window, text, limit)
+                    if distance > limit:
+                        continue
+                    score = (distance, intent.priority)
+                    if best_score is None or score < best_score:
+                        best, best_score = intent, score
+        return best
+
+    def match(self, text):
+        """Returns a reply dict for `text`, or None when no intent matches."""
+        start = time.perf_counter()
+        words = normalize(text)
+        intent, kind = self._exact(words), "exact"
+        if intent is None:
+            intent, kind = self._fuzzy(words), "fuzzy"
+        metrics.observe("intent_match_ms", (time.perf_counter() - start) * 1000)
+        metrics.inc("intent_matches_total", result=kind if intent is not None else "none")
+        if intent is None:
+            return None
+
+        if intent.action == "time":
+            response = f"The time is {time.strftime('%H:%M:%S')}"
+        else:
+            with self._lock:
+                response = intent.next_response()
+        return {"intent": intent.name, "response": response, "url": intent.url,
+                "action": intent.action, "match": kind}
+
+
+def load_intents(intents_file=INTENTS_FILE, qa_csv=QA_CSV_FILE, qa_jsonl=QA_JSONL_FILE):
+    """Reads intents.json, then the curated Q&A pairs; missing files are skipped."""
+    intents = []
+
+    def add(name, keys, responses, url=None, action=None):
+        intents.append(Intent(name, keys, responses, url, action, priority=len(intents)))
+
+    if os.path.exists(intents_file):
+        with open(intents_file, encoding="utf-8") as f:
+            for item in json.load(f)["intents"]:
+                add(item["name"], item["keys"], item.get("responses", []), item.get("url"), item.get("action"))
+
+    if os.path.exists(qa_csv):
+        with open(qa_csv, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                add(f"qa:{row['question']}", [row["question"]], [row["answer"]])
+
+    if os.path.exists(qa_jsonl):
+        with open(qa_jsonl, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    item = json.loads(line)
+                    add(f"qa:{item['instruction']}", [item["instruction"]], [item["response"]])
+    return intents
+
+
+_matcher = None
+_matcher_lock = threading.Lock()
+
+
+def get_matcher():
+    """Shared matcher, built from the intent files on first use."""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is None:
+            _matcher = IntentMatcher(load_intents())
+            print(f"✅ Intent matcher loaded with {len(_matcher.intents)} intents")
+        return _matcher
+
+
+def reload():
+    """Rebuilds the matcher after the intent files were edited."""
+    global _matcher
+    matcher = IntentMatcher(load_intents())
+    with _matcher_lock:
+        _matcher = matcher
+    return matcher
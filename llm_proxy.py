@@ -0,0 +1,166 @@
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import intent_matcher
+import metrics
+
+# --- CONFIGURATION ---
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "gemini")   # gemini | echo (offline stand-in)
+GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY", "")   # Never shipped to the browser
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-2.5-flash")
+# Point this at a local stub server to test without the real API
+GEMINI_BASE_URL = os.environ.get("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
+PROMPT_SUFFIX = " (Give the answer in 25 words or less)"
+TIMEOUT = 6.0           # Seconds a visitor waits before getting the fallback answer
+CACHE_SIZE = 256        # Distinct questions kept
+CACHE_TTL = 6 * 3600    # Seconds before a cached answer is asked again
+WORKERS = 4             # Concurrent backend calls
+FALLBACK_RESPONSE = "Sorry, I'm having trouble connecting right now. Please ask me again in a moment."
+# ---------------------
+
+
+class GeminiBackend:
+    """generateContent over plain HTTP (urllib), so no SDK is needed."""
+
+    def __init__(self, api_key=GEMINI_API_KEY, model=GEMINI_MODEL, base_url=GEMINI_BASE_URL):
+        self.api_key = api_key
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+
+    def generate(self, prompt, timeout):
+        if not self.api_key:
+            raise RuntimeError("GEMINI_API_KEY is not set")
+        url = f"{self.base_url}/models/{self.model}:generateContent?key={self.api_key}"
+        body = json.dumps({"contents": [{"parts": [{"text": prompt}]}]}).encode("utf-8")
+        request = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            data = json.loads(response.read().decode("utf-8"))
+        return data["candidates"][0]["content"]["parts"][0]["text"]
+
+
+class EchoBackend:
+    """Offline stand-in that answers immediately; useful for demos and load tests."""
+
+    def generate(self, prompt, timeout):
+        return f"You asked: {prompt}"
+
+
+BACKENDS = {
+    "gemini": GeminiBackend,
+    "echo": EchoBackend,
+}
+
+
+class TtlCache:
+    """LRU cache whose entries also expire `ttl` seconds after they were stored."""
+
+    def __init__(self, max_size=CACHE_SIZE, ttl=CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._items = OrderedDict()  # key -> (stored_at, value)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            if time.monotonic() - item[0] > self.ttl:
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return item[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = (time.monotonic(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+
+class LlmProxy:
+    """
+    Server-side LLM fallback for the chat page. Answers are cached by
+    normalised question (LRU + TTL); identical questions asked while a call
+    is in flight share that call instead of starting another. Each visitor
+    waits at most `timeout` seconds and then gets FALLBACK_RESPONSE; a late
+    answer still lands in the cache for the next visitor.
+    """
+
+    def __init__(self, backend, timeout=TIMEOUT, cache=None, workers=WORKERS):
+        self.backend = backend
+        self.timeout = timeout
+        self.cache = cache if cache is not None else TtlCache()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm")
+        self._inflight = {}  # key -> Future
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cache_key(text):
+        return " ".join(intent_matcher.normalize(text))
+
+    def ask(self, text):
+        """Returns (answer, source) where source is cache, llm, coalesced or fallback."""
+        start = time.perf_counter()
+        key = self.cache_key(text)
+        answer = self.cache.get(key)
+        if answer is not None:
+            return self._done(answer, "cache", start)
+
+        with self._lock:
+            future = self._inflight.get(key)
+            source = "coalesced" if future is not None else "llm"
+            if future is None:
+                future = self._inflight[key] = self._executor.submit(self._call, key, text)
+
+        try:
+            answer = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            print(f"⚠️ LLM call exceeded {self.timeout}s for '{key}'")
+            return self._done(FALLBACK_RESPONSE, "fallback", start)
+        except Exception as e:
+            print(f"⚠️ LLM call failed for '{key}': {e}")
+            return self._done(FALLBACK_RESPONSE, "fallback", start)
+        return self._done(answer, source, start)
+
+    def _call(self, key, text):
+        try:
+            with metrics.timer("llm_backend_ms", backend=type(self.backend).__name__):
+                answer = self.backend.generate(text + PROMPT_SUFFIX, self.timeout * 2)
+            self.cache.put(key, answer)
+            return answer
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _done(self, answer, source, start):
+        metrics.observe("llm_request_ms", (time.perf_counter() - start) * 1000, source=source)
+        metrics.inc("llm_requests_total", source=source)
+        return answer, source
+
+    def stats(self):
+        with self._lock:
+            inflight = len(self._inflight)
+        return {"backend": type(self.backend).__name__, "cached": len(self.cache), "inflight": inflight}
+
+
+_proxy = None
+_proxy_lock = threading.Lock()
+
+
+def get_proxy():
+    """Shared proxy using the LLM_BACKEND backend."""
+    global _proxy
+    with _proxy_lock:
+        if _proxy is None:
+            _proxy = LlmProxy(BACKENDS[LLM_BACKEND]())
+        return _proxy
@@ -0,0 +1,216 @@
+"""
+Lightweight in-process instrumentation shared by server.py, follow_me.py and
+Follow_me_function.py.
+
+    with metrics.timer("process_forward_ms"):
+        detections = net.forward()
+    metrics.inc("frames_dropped_total", stage="capture")
+    metrics.set_gauge("serial_queue_depth", 3, device="motor")
+
+render_prometheus() produces the text served at /metrics, and
+start_periodic_log() prints a one-line summary every few seconds.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+HISTOGRAM_SAMPLES = 1024   # Latest samples kept per histogram for percentiles
+RATE_WINDOW = 10           # Seconds over which counter rates are computed
+QUANTILES = (0.5, 0.95, 0.99)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_gauges = {}
+_gauge_fns = []
+_log_thread = None
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+class Histogram:
+    """Keeps the most recent samples and computes percentiles on demand."""
+
+    def __init__(self):
+        self.samples = deque(maxlen=HISTOGRAM_SAMPLES)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: 0.0 for q in QUANTILES}
+        last = len(ordered) - 1
+        return {q: ordered[min(last, int(round(q * last)))] for q in QUANTILES}
+
+
+class Counter:
+    """Monotonic total plus recent timestamps for a per-second rate."""
+
+    def __init__(self):
+        self.total = 0
+        self.recent = deque()
+
+    def inc(self, amount=1):
+        now = time.monotonic()
+        self.total += amount
+        self.recent.append((now, amount))
+        self._trim(now)
+
+    def rate(self):
+        now = time.monotonic()
+        self._trim(now)
+        return sum(amount for _, amount in self.recent) / RATE_WINDOW
+
+    def _trim(self, now):
+        while self.recent and now - self.recent[0][0] > RATE_WINDOW:
+            self.recent.popleft()
+
+
+def observe(name, value, **labels):
+    with _lock:
+        histogram = _histograms.get(_key(name, labels))
+        if histogram is None:
+            histogram = _histograms[_key(name, labels)] = Histogram()
+        histogram.observe(value)
+
+
+@contextmanager
+def timer(name, **labels):
+    """Records the duration of the block, in milliseconds, into histogram `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, (time.perf_counter() - start) * 1000, **labels)
+
+
+def inc(name, amount=1, **labels):
+    with _lock:
+        counter = _counters.get(_key(name, labels))
+        if counter is None:
+            counter = _counters[_key(name, labels)] = Counter()
+        counter.inc(amount)
+
+
+def set_gauge(name, value, **labels):
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+def register_gauge_fn(fn):
+    """fn() -> iterable of (name, labels_dict, value), collected at render time."""
+    with _lock:
+        _gauge_fns.append(fn)
+
+
+def unregister_gauge_fn(fn):
+    with _lock:
+        if fn in _gauge_fns:
+            _gauge_fns.remove(fn)
+
+
+def _collect_gauges():
+    with _lock:
+        gauges = dict(_gauges)
+        fns = list(_gauge_fns)
+    for fn in fns:
+        try:
+            for name, labels, value in fn():
+                gauges[_key(name, labels)] = value
+        except Exception as e:
+            print(f"⚠️ Metrics gauge callback failed: {e}")
+    return gauges
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def snapshot():
+    """All metrics as plain dicts: (histograms, counters, gauges)."""
+    with _lock:
+        histograms = {key: (h.quantiles(), h.count, h.total) for key, h in _histograms.items()}
+        counters = {key: (c.total, c.rate()) for key, c in _counters.items()}
+    return histograms, counters, _collect_gauges()
+
+
+def summarize(samples):
+    """Count, mean and QUANTILES of a complete list of samples (benchmarks, replays)."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {"count": 0}
+    last = len(ordered) - 1
+    summary = {"count": len(ordered), "mean": round(sum(ordered) / len(ordered), 3)}
+    for q in QUANTILES:
+        summary[f"p{int(q * 100)}"] = round(ordered[min(last, int(round(q * last)))], 3)
+    return summary
+
+
+def render_prometheus():
+    """Prometheus text exposition format."""
+    histograms, counters, gauges = snapshot()
+    lines = []
+    seen = set()
+    for (name, labels), (quantiles, count, total) in sorted(histograms.items()):
+        if name not in seen:
+            lines.append(f"# TYPE {name} summary")
+            seen.add(name)
+        for q, value in quantiles.items():
+            lines.append(f"{name}{_format_labels(labels, [('quantile', q)])} {value:.3f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {total:.3f}")
+    for (name, labels), (total, rate) in sorted(counters.items()):
+        if name not in seen:
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"# TYPE {name}_per_second gauge")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {total}")
+        lines.append(f"{name}_per_second{_format_labels(labels)} {rate:.3f}")
+    for (name, labels), value in sorted(gauges.items()):
+        if name not in seen:
+            lines.append(f"# TYPE {name} gauge")
+            seen.add(name)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def summary_line():
+    """Compact one-line view: p50/p95 per histogram, rate per counter, gauges."""
+    histograms, counters, gauges = snapshot()
+    parts = []
+    for (name, labels), (quantiles, _, _) in sorted(histograms.items()):
+        parts.append(f"{name}{_format_labels(labels)} p50={quantiles[0.5]:.1f} p95={quantiles[0.95]:.1f}")
+    for (name, labels), (_, rate) in sorted(counters.items()):
+        parts.append(f"{name}{_format_labels(labels)} {rate:.1f}/s")
+    for (name, labels), value in sorted(gauges.items()):
+        parts.append(f"{name}{_format_labels(labels)}={value}")
+    return " | ".join(parts)
+
+
+def start_periodic_log(interval=10):
+    """Prints summary_line() every `interval` seconds from a daemon thread (once per process)."""
+    global _log_thread
+    if _log_thread is not None:
+        return
+
+    def _log_loop():
+        while True:
+            time.sleep(interval)
+            line = summary_line()
+            if line:
+                print(f"📊 {line}")
+
+    _log_thread = threading.Thread(target=_log_loop, name="metrics-log", daemon=True)
+    _log_thread.start()
@@ -0,0 +1,172 @@
+import cv2
+import numpy as np
+import os
+import threading
+import time
+from batch_inference import BatchInferenceEngine
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- CONFIGURATION ---
+DEFAULT_BACKEND = "opencv"
+DEFAULT_TARGET = "cpu"
+DEFAULT_INPUT_SIZE = (300, 300)
+WARMUP_RUNS = 2   # The first forward() pays graph setup; run it before real frames
+
+# Each model lists candidate files; the first one that exists is used.
+MODELS = {
+    "res10_ssd": {
+        "config": ["models/deploy.prototxt", "deploy.prototxt"],
+        "weights": [
+            "models/res10_300x300_ssd_iter_140000.caffemodel",
+            "models/res10_300x300_ssd_iter_140000 (1).caffemodel",
+            "res10_300x300_ssd_iter_140000.caffemodel",
+        ],
+        "mean": (104.0, 177.0, 123.0),
+    },
+}
+
+BACKENDS = {
+    "default": cv2.dnn.DNN_BACKEND_DEFAULT,
+    "opencv": cv2.dnn.DNN_BACKEND_OPENCV,
+    "openvino": cv2.dnn.DNN_BACKEND_INFERENCE_ENGINE,
+}
+
+TARGETS = {
+    "cpu": cv2.dnn.DNN_TARGET_CPU,
+    "opencl": cv2.dnn.DNN_TARGET_OPENCL,
+    "opencl_fp16": cv2.dnn.DNN_TARGET_OPENCL_FP16,
+}
+# ---------------------
+
+_lock = threading.Lock()
+_nets = {}      # (name, backend, target, input_size) -> LoadedModel
+_engines = {}   # same key -> BatchInferenceEngine
+
+
+class LoadedModel:
+    def __init__(self, net, name, backend, target, input_size, load_ms, warmup_ms):
+        self.net = net
+        self.name = name
+        self.backend = backend
+        self.target = target
+        self.input_size = input_size
+        self.load_ms = load_ms
+        self.warmup_ms = warmup_ms
+        self.lock = threading.Lock()  # cv2.dnn.Net is not safe to share between threads
+
+    def info(self):
+        return {
+            "model": self.name,
+            "backend": self.backend,
+            "target": self.target,
+            "input_size": list(self.input_size),
+            "load_ms": round(self.load_ms, 1),
+            "warmup_ms": round(self.warmup_ms, 1),
+        }
+
+
+def _resolve(candidates):
+    for candidate in candidates:
+        path = os.path.join(BASE_DIR, candidate)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def available_backends():
+    """(backend, target) name pairs this OpenCV build can run."""
+    names = {(b, t): (bn, tn) for bn, b in BACKENDS.items() for tn, t in TARGETS.items()}
+    try:
+        pairs = cv2.dnn.getAvailableBackends()
+    except AttributeError:
+        return [(DEFAULT_BACKEND, DEFAULT_TARGET)]
+    return [names[pair] for pair in pairs if pair in names]
+
+
+def _load(name, backend, target, input_size):
+    spec = MODELS[name]
+    config = _resolve(spec["config"])
+    weights = _resolve(spec["weights"])
+    if config is None or weights is None:
+        print("❌ Model files not found! Please download them from:")
+        print("https://github.com/opencv/opencv/tree/master/samples/dnn/face_detector")
+        raise FileNotFoundError(f"Model files for '{name}' not found (looked for {spec['weights']})")
+
+    start = time.perf_counter()
+    net = cv2.dnn.readNetFromCaffe(config, weights)
+    net.setPreferableBackend(BACKENDS[backend])
+    net.setPreferableTarget(TARGETS[target])
+    load_ms = (time.perf_counter() - start) * 1000
+
+    # Warm-up: run dummy frames so graph setup is not paid by the first real frame
+    start = time.perf_counter()
+    dummy = np.zeros((input_size[1], input_size[0], 3), dtype=np.uint8)
+    blob = cv2.dnn.blobFromImage(dummy, 1.0, input_size, spec["mean"])
+    for _ in range(WARMUP_RUNS):
+        net.setInput(blob)
+        net.forward()
+    warmup_ms = (time.perf_counter() - start) * 1000
+
+    print(f"✅ Loaded {name} ({backend}/{target}, {input_size[0]}x{input_size[1]}) "
+          f"in {load_ms:.0f} ms, warm-up {warmup_ms:.0f} ms")
+    return LoadedModel(net, name, backend, target, input_size, load_ms, warmup_ms)
+
+
+def get_model(name="res10_ssd", backend=DEFAULT_BACKEND, target=DEFAULT_TARGET,
+              input_size=DEFAULT_INPUT_SIZE):
+    """Loads and warms a network once per (model, backend, target, input size)."""
+    key = (name, backend, target, tuple(input_size))
+    with _lock:
+        model = _nets.get(key)
+        if model is None:
+            model = _nets[key] = _load(name, backend, target, tuple(input_size))
+        return model
+
+
+def get_engine(name="res10_ssd", backend=DEFAULT_BACKEND, target=DEFAULT_TARGET,
+               input_size=DEFAULT_INPUT_SIZE):
+    """Shared BatchInferenceEngine around the warm network for this configuration."""
+    key = (name, backend, target, tuple(input_size))
+    model = get_model(name, backend, target, input_size)
+    with _lock:
+        engine = _engines.get(key)
+        if engine is None:
+            engine = _engines[key] = BatchInferenceEngine(
+                model.net, input_size=tuple(input_size), mean=MODELS[name]["mean"], net_lock=model.lock)
+        return engine
+
+
+def status():
+    with _lock:
+        return [model.info() for model in _nets.values()]
+
+
+def benchmark(name="res10_ssd", input_sizes=((300, 300), (240, 240), (160, 160)), runs=20):
+    """Average forward() time for every available backend/target and input size."""
+    results = []
+    for backend, target in available_backends():
+        for input_size in input_sizes:
+            try:
+                model = get_model(name, backend, target, input_size)
+            except Exception as e:
+                print(f"⚠️ {backend}/{target} {input_size}: {e}")
+                continue
+            frame = np.random.randint(0, 255, (480, 640, 3), dtype=np.uint8)
+            blob = cv2.dnn.blobFromImage(cv2.resize(frame, input_size), 1.0, input_size, MODELS[name]["mean"])
+            with model.lock:
+                start = time.perf_counter()
+                for _ in range(runs):
+                    model.net.setInput(blob)
+                    model.net.forward()
+                forward_ms = (time.perf_counter() - start) * 1000 / runs
+            info = model.info()
+            info["forward_ms"] = round(forward_ms, 2)
+            results.append(info)
+            print(f"{backend:>8}/{target:<12} {input_size[0]}x{input_size[1]}: "
+                  f"forward {forward_ms:6.2f} ms, warm-up {model.warmup_ms:6.1f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark()
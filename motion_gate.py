@@ -0,0 +1,61 @@
+import cv2
+import time
+import metrics
+
+# --- CONFIGURATION ---
+GATE_SIZE = (64, 48)        # Frames are compared at this tiny resolution
+PIXEL_DELTA = 25            # Grey-level change that counts a pixel as moved
+MOTION_FRACTION = 0.01      # Fraction of moved pixels that triggers a new detection
+FORCE_REFRESH_SECONDS = 2.0 # Detect at least this often even on a static scene
+# ---------------------
+
+
+class MotionGate:
+    """
+    Decides whether a frame needs a fresh detection pass. The frame is
+    shrunk to GATE_SIZE in grey scale and compared with the frame of the last
+    detection; if too few pixels changed, the caller reuses its previous
+    detections. A detection is forced every refresh_seconds regardless.
+    """
+
+    def __init__(self, pixel_delta=PIXEL_DELTA, motion_fraction=MOTION_FRACTION,
+                 refresh_seconds=FORCE_REFRESH_SECONDS, size=GATE_SIZE, name="default"):
+        self.pixel_delta = pixel_delta
+        self.motion_fraction = motion_fraction
+        self.refresh_seconds = refresh_seconds
+        self.size = size
+        self.name = name
+        self.reference = None
+        self.last_detection = 0.0
+        self.skipped = 0
+        self.passed = 0
+
+    def _signature(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        grey = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(grey, (5, 5), 0)
+
+    def needs_detection(self, frame, now=None):
+        """
+        True if the scene changed (or the refresh interval elapsed) since the
+        last detection. `now` overrides the clock (recorded time during replay).
+        """
+        signature = self._signature(frame)
+        now = time.monotonic() if now is None else now
+        due = self.reference is None or now - self.last_detection >= self.refresh_seconds
+        if not due:
+            moved = cv2.absdiff(signature, self.reference) > self.pixel_delta
+            due = moved.mean() >= self.motion_fraction
+        if due:
+            self.reference = signature
+            self.last_detection = now
+            self.passed += 1
+            metrics.inc("motion_gate_total", gate=self.name, result="detect")
+        else:
+            self.skipped += 1
+            metrics.inc("motion_gate_total", gate=self.name, result="skip")
+        return due
+
+    def reset(self):
+        """Forces a detection on the next frame."""
+        self.reference = None
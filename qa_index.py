@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import zlib
+import numpy as np
+import intent_matcher
+import metrics
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- CONFIGURATION ---
+INDEX_DIR = os.path.join(BASE_DIR, "qa_index")
+NGRAM_SIZES = (3, 4)    # Character n-grams; robust to misheard or misspelt words
+DIMENSIONS = 2 ** 14    # n-grams are hashed into this many columns (no vocabulary to store)
+MIN_SCORE = 0.6         # Cosine similarity below this is "no confident answer" (goes to the LLM)
+CURRENT_FILE = "CURRENT"  # In INDEX_DIR: name of the version directory in use
+# ---------------------
+
+
+def _ngrams(text):
+    """Character n-grams of the normalised words, each word padded with spaces."""
+    padded = " " + " ".join(intent_matcher.normalize(text)) + " "
+    for n in NGRAM_SIZES:
+        for i in range(len(padded) - n + 1):
+            yield padded[i:i + n]
+
+
+def _counts(text):
+    """Term counts as a dense row over the hashed n-gram columns."""
+    row = np.zeros(DIMENSIONS, dtype=np.float32)
+    for gram in _ngrams(text):
+        row[zlib.crc32(gram.encode("utf-8")) % DIMENSIONS] += 1
+    return row
+
+
+def load_documents():
+    """(question, answer, url) for every Q&A pair and every intent key with a fixed reply."""
+    documents = []
+    for intent in intent_matcher.load_intents():
+        if intent.action is not None or not intent.responses:
+            continue  # Dynamic replies (time, exit) stay with the intent matcher
+        for key in intent.keys:
+            documents.append({"question": key, "answer": intent.responses[0], "url": intent.url})
+    return documents
+
+
+def _fingerprint():
+    """Changes whenever one of the source files does, so a stale index is rebuilt."""
+    digest = hashlib.sha1(f"{NGRAM_SIZES}|{DIMENSIONS}".encode("utf-8"))
+    for path in (intent_matcher.INTENTS_FILE, intent_matcher.QA_CSV_FILE, intent_matcher.QA_JSONL_FILE):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            digest.update(f"{path}|{stat.st_size}|{stat.st_mtime_ns}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class QaIndex:
+    """
+    TF-IDF over hashed character n-grams of the curated questions. Rows are
+    L2-normalised, so answering a query is one matrix-vector product (cosine
+    similarity against every question at once) and an argmax.
+    """
+
+    def __init__(self, matrix, idf, documents):
+        self.matrix = matrix        # (N, DIMENSIONS) float32, may be a read-only memory map
+        self.idf = idf              # (DIMENSIONS,) float32
+        self.documents = documents
+
+    @classmethod
+    def build(cls, documents):
+        start = time.perf_counter()
+        counts = np.stack([_counts(doc["question"]) for doc in documents]) if documents \
+            else np.zeros((0, DIMENSIONS), dtype=np.float32)
+        df = np.count_nonzero(counts, axis=0).astype(np.float32)
+        idf = (np.log((1 + len(documents)) / (1 + df)) + 1).astype(np.float32)
+        matrix = counts * idf
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.maximum(norms, 1e-12)
+        print(f"✅ Built Q&A index: {len(documents)} questions in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return cls(matrix.astype(np.float32), idf, documents)
+
+    def save(self, index_dir, fingerprint):
+        """
+        Writes the index to a new version directory and then points CURRENT_FILE
+        at it, so files a live index has memory-mapped are never overwritten.
+        Returns the version directory, or None if saving failed.
+        """
+        try:
+            return self._save(index_dir, fingerprint)
+        except OSError as e:
+            # The index still works from RAM
+            print(f"⚠️ Could not save Q&A index to {index_dir}: {e}")
+            return None
+
+    def _save(self, index_dir, fingerprint):
+        version = f"v{time.time_ns()}-{fingerprint[:8]}"
+        version_dir = os.path.join(index_dir, version)
+        os.makedirs(version_dir)  # Always a fresh directory, never one that may be mapped
+        np.save(os.path.join(version_dir, "matrix.npy"), self.matrix)
+        np.save(os.path.join(version_dir, "idf.npy"), self.idf)
+        with open(os.path.join(version_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "documents": self.documents}, f)
+        pointer = os.path.join(index_dir, CURRENT_FILE)
+        with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(pointer + ".tmp", pointer)  # Atomic switch to the new version
+        return version_dir
+
+    @classmethod
+    def load(cls, index_dir, fingerprint):
+        """Memory-maps the current saved version; returns None if it is missing or stale."""
+        try:
+            with open(os.path.join(index_dir, CURRENT_FILE), encoding="utf-8") as f:
+                version_dir = os.path.join(index_dir, f.read().strip())
+            with open(os.path.join(version_dir, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get("fingerprint") != fingerprint:
+            return None
+        matrix = np.load(os.path.join(version_dir, "matrix.npy"), mmap_mode="r")
+        idf = np.load(os.path.join(version_dir, "idf.npy"))
+        return cls(matrix, idf, meta["documents"])
+
+    def query(self, text, k=1):
+        """Top-k (score, document) pairs for `text`, best first."""
+        if not self.documents:
+            return []
+        vector = _counts(text) * self.idf
+        norm = np.linalg.norm(vector)
+        if norm == 0:
+            return []
+        scores = self.matrix @ (vector / norm)
+        top = np.argsort(-scores)[:k]
+        return [(float(scores[i]), self.documents[i]) for i in top]
+
+    def answer(self, text, min_score=MIN_SCORE):
+        """Best answer as a reply dict, or None when nothing is similar enough."""
+        start = time.perf_counter()
+        results = self.query(text)
+        metrics.observe("qa_query_ms", (time.perf_counter() - start) * 1000)
+        if not results or results[0][0] < min_score:
+            metrics.inc("qa_answers_total", result="miss")
+            return None
+        score, doc = results[0]
+        metrics.inc("qa_answers_total", result="hit")
+        return {"response": doc["answer"], "url": doc["url"], "question": doc["question"],
+                "score": round(score, 3)}
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _remove_old_versions(index_dir):
+    """Deletes version directories other than the current one (best effort)."""
+    try:
+        with open(os.path.join(index_dir, CURRENT_FILE), encoding="utf-8") as f:
+            current = f.read().strip()
+        names = os.listdir(index_dir)
+    except OSError:
+        return
+    for name in names:
+        path = os.path.join(index_dir, name)
+        if name == current or not os.path.isdir(path):
+            continue
+        try:
+            shutil.rmtree(path)
+        except OSError:
+            pass  # Still memory-mapped (Windows); removed on a later rebuild
+
+
+def _build_and_load(index_dir, fingerprint):
+    """Builds and saves a fresh index, then serves it memory-mapped from the saved files."""
+    index = QaIndex.build(load_documents())
+    if index.save(index_dir, fingerprint) is not None:
+        index = QaIndex.load(index_dir, fingerprint) or index
+    return index
+
+
+def get_index(index_dir=INDEX_DIR):
+    """Shared index: memory-mapped from disk when up to date, otherwise rebuilt and saved."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            fingerprint = _fingerprint()
+            _index = QaIndex.load(index_dir, fingerprint)
+            if _index is None:
+                _index = _build_and_load(index_dir, fingerprint)
+                _remove_old_versions(index_dir)
+        return _index
+
+
+def reload(index_dir=INDEX_DIR):
+    """
+    Rebuilds the index from the source files (after they were edited). The
+    new version is written next to the live one and swapped in once loaded,
+    so in-flight queries keep reading the old files.
+    """
+    global _index
+    index = _build_and_load(index_dir, _fingerprint())
+    with _index_lock:
+        _index = index
+    _remove_old_versions(index_dir)
+    return index
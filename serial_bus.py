@@ -0,0 +1,342 @@
+import os
+import serial
+import threading
+import time
+from collections import deque
+import metrics
+import serial_protocol
+
+# --- CONFIGURATION ---
+# Ports can be overridden from the environment, e.g. with the pty paths printed by arduino_sim.py
+MOTOR_SERIAL_PORT = os.environ.get("MOTOR_SERIAL_PORT", 'Com23')
+FACE_SERIAL_PORT = os.environ.get("FACE_SERIAL_PORT", 'COM12')
+SERIAL_BAUDRATE = 9600
+# "raw" writes bare command characters (current firmware); "framed" uses
+# serial_protocol.py frames with sequence numbers, checksums and acks
+SERIAL_PROTOCOL = os.environ.get("SERIAL_PROTOCOL", "raw")
+QUEUE_SIZE = 32          # Max pending commands per device
+LINK_BUDGET = 0.5        # Fraction of the link's byte rate non-safety traffic may use
+BURST_BYTES = 16         # Bytes that may be sent back to back before the budget applies
+SETTLE_TIME = float(os.environ.get("SERIAL_SETTLE_TIME", 2))  # Arduino resets when the port opens
+RECONNECT_DELAY = 2      # Seconds between reconnect attempts
+# ---------------------
+
+# Priority classes, highest first. Pending commands are written in this order.
+PRIORITY_SAFETY = 0      # Stop/toggle: preempts everything, ignores the rate budget
+PRIORITY_STEERING = 1    # Motor targets; a newer one replaces a pending one
+PRIORITY_COSMETIC = 2    # Face animation
+PRIORITY_NAMES = {PRIORITY_SAFETY: "safety", PRIORITY_STEERING: "steering", PRIORITY_COSMETIC: "cosmetic"}
+
+
+class SerialDevice:
+    """
+    Owns one serial port. Commands are put on a bounded queue and written
+    by a dedicated background thread, so callers never block on the port.
+
+    state_commands: commands that set a target state (e.g. steering). A newer
+        one replaces a pending one, and re-sending the current state is skipped.
+    toggle_commands: commands whose repetition matters, never coalesced.
+    safety_commands: commands sent at PRIORITY_SAFETY. They jump every queue,
+        bypass the rate budget and drop pending state commands as obsolete.
+    default_priority: class of every other command on this device.
+    protocol: "raw" or "framed". Framed commands carry a sequence number and
+        checksum; a reader thread matches the Arduino's acks to measure
+        round-trip time and loss (see serial_protocol.LinkStats).
+    """
+
+    def __init__(self, name, port, baudrate=SERIAL_BAUDRATE, queue_size=QUEUE_SIZE,
+                 state_commands=(), toggle_commands=(), safety_commands=(),
+                 default_priority=PRIORITY_STEERING, protocol=SERIAL_PROTOCOL):
+        self.name = name
+        self.port = port
+        self.baudrate = baudrate
+        self.queue_size = queue_size
+        self.state_commands = set(state_commands)
+        self.toggle_commands = set(toggle_commands)
+        self.safety_commands = set(safety_commands)
+        self.default_priority = default_priority
+        self.protocol = protocol
+        self.link = serial_protocol.LinkStats(name) if protocol == "framed" else None
+        self.ser = None
+        self.connected = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.preempted = 0
+        self.last_command = None
+        self.worst_stop_ms = None
+        self._queues = {priority: deque() for priority in PRIORITY_NAMES}  # of (command, enqueued_at)
+        # Token bucket in bytes, refilled at LINK_BUDGET of the wire rate (8N1: 10 bits per byte)
+        self.budget_bytes_per_second = baudrate / 10.0 * LINK_BUDGET
+        self._frame_bytes = serial_protocol.FRAME_SIZE if protocol == "framed" else 1
+        self._tokens = float(BURST_BYTES)
+        self._refilled_at = time.monotonic()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        """Starts the writer thread (idempotent)."""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._writer_loop, name=f"serial-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2)
+        self._close()
+
+    def send(self, command, priority=None):
+        """
+        Enqueues a command and returns immediately.
+        Returns False if it was coalesced with a pending command.
+        priority defaults to the command's class on this device.
+        """
+        command_str = str(command)
+        if priority is None:
+            priority = self.priority_for(command_str)
+        self.start()
+        with self._cond:
+            queue = self._queues[priority]
+            if priority == PRIORITY_SAFETY:
+                # Pending steering targets are obsolete once the robot is told to stop
+                self._drop_pending_states()
+            elif command_str not in self.toggle_commands:
+                if queue and command_str == queue[-1][0]:
+                    # Same as the newest pending command
+                    self._count_coalesced()
+                    return False
+                if command_str in self.state_commands:
+                    if command_str == self._current_state():
+                        self._count_coalesced()
+                        return False
+                    # A newer target state supersedes every pending one, wherever it sits
+                    superseded = self._remove_pending_states()
+                    if superseded:
+                        self._count_coalesced(superseded)
+            if self._depth() >= self.queue_size:
+                self._drop_oldest()
+            self._queues[priority].append((command_str, time.perf_counter()))
+            self._cond.notify()
+        return True
+
+    def priority_for(self, command_str):
+        return PRIORITY_SAFETY if command_str in self.safety_commands else self.default_priority
+
+    def _count_coalesced(self, count=1):
+        self.coalesced += count
+        metrics.inc("serial_commands_coalesced_total", count, device=self.name)
+
+    def _depth(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _drop_oldest(self):
+        """Queue full: drop the oldest command of the lowest non-empty class. Caller holds the lock."""
+        for priority in sorted(self._queues, reverse=True):
+            if self._queues[priority]:
+                self._queues[priority].popleft()
+                self.dropped += 1
+                metrics.inc("serial_commands_dropped_total", device=self.name)
+                return
+
+    def _remove_pending_states(self):
+        """Removes pending state commands and returns how many. Caller holds the lock."""
+        removed = 0
+        for priority, queue in self._queues.items():
+            if priority == PRIORITY_SAFETY:
+                continue
+            kept = deque(item for item in queue if item[0] not in self.state_commands)
+            if len(kept) != len(queue):
+                removed += len(queue) - len(kept)
+                self._queues[priority] = kept
+        return removed
+
+    def _drop_pending_states(self):
+        """Removes pending state commands (preempted by a safety command). Caller holds the lock."""
+        removed = self._remove_pending_states()
+        if removed:
+            self.preempted += removed
+            metrics.inc("serial_commands_preempted_total", removed, device=self.name)
+
+    def _current_state(self):
+        """
+        State the device will be in once the queue drains. Caller holds the lock.
+        Toggles are written before state commands, so a pending state command wins.
+        """
+        for priority in sorted(self._queues, reverse=True):
+            for command_str, _ in reversed(self._queues[priority]):
+                if command_str in self.state_commands:
+                    return command_str
+        for queue in self._queues.values():
+            if any(command_str in self.toggle_commands for command_str, _ in queue):
+                return None  # A toggle resets the device state
+        if self.last_command in self.state_commands:
+            return self.last_command
+        return None
+
+    def _next_item(self):
+        """(priority, item) of the command to write next, or (None, None). Caller holds the lock."""
+        for priority in sorted(self._queues):
+            if self._queues[priority]:
+                return priority, self._queues[priority][0]
+        return None, None
+
+    def _budget_wait(self, priority):
+        """Seconds until the next frame fits the rate budget (0 = send now, tokens taken). Caller holds the lock."""
+        now = time.monotonic()
+        self._tokens = min(float(BURST_BYTES),
+                           self._tokens + (now - self._refilled_at) * self.budget_bytes_per_second)
+        self._refilled_at = now
+        if priority == PRIORITY_SAFETY or self._tokens >= self._frame_bytes:
+            self._tokens -= self._frame_bytes
+            return 0
+        return (self._frame_bytes - self._tokens) / self.budget_bytes_per_second
+
+    def queue_depth(self):
+        with self._cond:
+            return self._depth()
+
+    def status(self):
+        with self._cond:
+            info = {
+                "port": self.port,
+                "protocol": self.protocol,
+                "connected": self.connected,
+                "queue_depth": self._depth(),
+                "queued_by_priority": {PRIORITY_NAMES[p]: len(q) for p, q in self._queues.items()},
+                "sent": self.sent,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "preempted": self.preempted,
+                "last_command": self.last_command,
+                "budget_bytes_per_second": self.budget_bytes_per_second,
+                "worst_stop_latency_ms": self.worst_stop_ms,
+            }
+        if self.link is not None:
+            info["link"] = self.link.stats()
+        return info
+
+    # --- Writer thread ---
+
+    def _open(self):
+        try:
+            # serial_for_url also accepts pyserial URLs such as loop:// (used by the benchmarks)
+            self.ser = serial.serial_for_url(self.port, baudrate=self.baudrate, timeout=1)
+            time.sleep(SETTLE_TIME)  # Wait for the Arduino to finish resetting
+            self.connected = True
+            print(f"✅ Connected to {self.name} Arduino on {self.port} at {self.baudrate} baud ({self.protocol}).")
+            if self.link is not None:
+                self.link.reset()
+                threading.Thread(target=self._reader_loop, args=(self.ser,),
+                                 name=f"serial-{self.name}-reader", daemon=True).start()
+        except (serial.SerialException, ValueError) as e:
+            print(f"⚠️ Could not open {self.name} serial port {self.port}. Retrying in {RECONNECT_DELAY}s. Details: {e}")
+            self.ser = None
+            self.connected = False
+
+    def _close(self):
+        if self.ser is not None:
+            try:
+                self.ser.close()
+            except serial.SerialException:
+                pass
+        self.ser = None
+        self.connected = False
+
+    def _encode(self, command_str):
+        if self.link is not None:
+            return self.link.next_frame(command_str)
+        return command_str.encode()
+
+    def _reader_loop(self, ser):
+        """Framed protocol only: reads acks/naks until this connection is replaced or closed."""
+        parser = serial_protocol.FrameParser()
+        while self._running and self.ser is ser:
+            try:
+                data = ser.read(ser.in_waiting or 1)
+            except (serial.SerialException, OSError, TypeError):
+                return  # Port closed; the writer thread reconnects
+            for frame in parser.feed(data):
+                self.link.on_frame(*frame)
+            self.link.expire()
+
+    def _writer_loop(self):
+        while True:
+            if self.ser is None:
+                self._open()
+                if self.ser is None:
+                    with self._cond:
+                        self._cond.wait(timeout=RECONNECT_DELAY)
+                        if not self._running:
+                            return
+                    continue
+
+            with self._cond:
+                while True:
+                    if not self._running:
+                        return
+                    priority, item = self._next_item()
+                    if item is None:
+                        self._cond.wait()
+                        continue
+                    wait = self._budget_wait(priority)
+                    if wait <= 0:
+                        break
+                    # Over budget: wait, but wake early if a (possibly safety) command arrives
+                    self._cond.wait(timeout=wait)
+                command_str, enqueued_at = item
+
+            try:
+                with metrics.timer("serial_write_ms", device=self.name):
+                    self.ser.write(self._encode(command_str))
+            except (serial.SerialException, OSError) as e:
+                # Keep the command at the head of the queue and reconnect.
+                print(f"⚠️ Write to {self.name} on {self.port} failed, reconnecting. Details: {e}")
+                self._close()
+                continue
+
+            with self._cond:
+                queue = self._queues[priority]
+                if queue and queue[0] is item:
+                    queue.popleft()
+                self.sent += 1
+                self.last_command = command_str
+                if priority == PRIORITY_SAFETY:
+                    stop_ms = (time.perf_counter() - enqueued_at) * 1000
+                    self.worst_stop_ms = round(max(self.worst_stop_ms or 0.0, stop_ms), 2)
+            metrics.inc("serial_commands_sent_total", device=self.name)
+            if priority == PRIORITY_SAFETY:
+                metrics.observe("serial_stop_latency_ms", stop_ms, device=self.name)
+            print(f"Sent command to {self.name}: {command_str}")
+
+
+# Steering commands are positions; 's' is a start/stop toggle and the safety stop.
+motor = SerialDevice("motor", MOTOR_SERIAL_PORT,
+                     state_commands=('1', '2', '3', '4', '5'), toggle_commands=('s',),
+                     safety_commands=('s',), default_priority=PRIORITY_STEERING)
+face = SerialDevice("face", FACE_SERIAL_PORT, default_priority=PRIORITY_COSMETIC)
+DEVICES = {"motor": motor, "face": face}
+
+
+def get_device(target_id):
+    return DEVICES[target_id]
+
+
+def status():
+    """Queue depth and counters for every device."""
+    return {name: device.status() for name, device in DEVICES.items()}
+
+
+def _queue_gauges():
+    for name, device in DEVICES.items():
+        yield "serial_queue_depth", {"device": name}, device.queue_depth()
+        yield "serial_connected", {"device": name}, int(device.connected)
+
+
+metrics.register_gauge_fn(_queue_gauges)
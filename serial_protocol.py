@@ -0,0 +1,198 @@
+"""
+Framed serial protocol between the host and the Arduinos.
+
+Every frame is 6 bytes:  STX | seq | kind | value | checksum | ETX
+    STX = 0x02, ETX = 0x03, seq counts 0..255 and wraps,
+    checksum = seq ^ kind ^ value.
+
+Host -> Arduino:  kind 'C' (command, ack requested) or 'c' (no ack),
+                  value = the command character from the maps below.
+Arduino -> host:  kind 'A' (ack, value 0) or 'N' (nak, value = NAK_* code),
+                  carrying the seq of the command it answers.
+"""
+import threading
+import time
+from collections import deque
+import metrics
+
+# --- Command sets (client key -> Arduino command) ---
+MOTOR_MAP = {
+    '3': '3',
+    'r': 'b',
+    '2': '4',
+    '4': '2',
+    '1': '5',
+    '5': '1'
+}
+
+FACE_MAP = {
+    'H': 'H',
+    'B': 'B',
+    'r': 'e'
+}
+
+CONTROL_MAP = {
+    's': 's'  # Start/Stop toggle (controls the motor controller)
+}
+
+MOTOR_COMMANDS = frozenset(MOTOR_MAP.values()) | frozenset(CONTROL_MAP.values())
+FACE_COMMANDS = frozenset(FACE_MAP.values())
+
+# --- CONFIGURATION ---
+ACK_TIMEOUT = 0.5       # Seconds without an ack before a command counts as lost
+RTT_WINDOW = 512        # Recent round-trip times kept for p50/p99
+# ---------------------
+
+STX = 0x02
+ETX = 0x03
+FRAME_SIZE = 6
+KIND_COMMAND = ord('C')
+KIND_COMMAND_NO_ACK = ord('c')
+KIND_ACK = ord('A')
+KIND_NAK = ord('N')
+
+NAK_CHECKSUM = 1        # Frame arrived corrupted
+NAK_UNKNOWN = 2         # Command not in the device's command set
+NAK_OVERFLOW = 3        # Receive buffer overflowed before this frame; this frame itself was executed
+NAK_REASONS = {NAK_CHECKSUM: "checksum", NAK_UNKNOWN: "unknown_command", NAK_OVERFLOW: "overflow"}
+
+
+def checksum(seq, kind, value):
+    return seq ^ kind ^ value
+
+
+def encode_frame(seq, kind, value):
+    seq, value = seq & 0xFF, value & 0xFF
+    return bytes((STX, seq, kind, value, checksum(seq, kind, value), ETX))
+
+
+def encode_command(seq, command, ack=True):
+    """Frame for a single-character command."""
+    return encode_frame(seq, KIND_COMMAND if ack else KIND_COMMAND_NO_ACK, ord(command))
+
+
+class FrameParser:
+    """
+    Incremental decoder for a byte stream. feed() returns the complete frames
+    as (seq, kind, value, valid) tuples; valid is False on a checksum
+    mismatch. Bytes that do not form a frame are skipped to resynchronise.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.discarded = 0
+
+    def feed(self, data):
+        self._buffer.extend(data)
+        frames = []
+        while True:
+            start = self._buffer.find(STX)
+            if start < 0:
+                self.discarded += len(self._buffer)
+                self._buffer.clear()
+                break
+            if start:
+                self.discarded += start
+                del self._buffer[:start]
+            if len(self._buffer) < FRAME_SIZE:
+                break
+            _, seq, kind, value, check, end = self._buffer[:FRAME_SIZE]
+            if end != ETX:
+                # Not a frame boundary; drop this STX and search again
+                self.discarded += 1
+                del self._buffer[:1]
+                continue
+            frames.append((seq, kind, value, check == checksum(seq, kind, value)))
+            del self._buffer[:FRAME_SIZE]
+        return frames
+
+
+class LinkStats:
+    """
+    Host-side bookkeeping for one framed link: assigns sequence numbers,
+    matches acks to sent frames for round-trip time, and counts naks and
+    commands never acknowledged within ACK_TIMEOUT as lost.
+    """
+
+    def __init__(self, name, ack_timeout=ACK_TIMEOUT):
+        self.name = name
+        self.ack_timeout = ack_timeout
+        self._seq = 0
+        self._pending = {}  # seq -> (sent_at, command)
+        self._rtts = deque(maxlen=RTT_WINDOW)
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.acked = 0
+        self.lost = 0
+        self.naks = {reason: 0 for reason in NAK_REASONS.values()}
+
+    def next_frame(self, command, ack=True):
+        """Frame bytes for `command`, registered as awaiting an ack when ack=True."""
+        with self._lock:
+            seq = self._seq
+            self._seq = (self._seq + 1) & 0xFF
+            if ack:
+                if seq in self._pending:
+                    self._lost(1)  # Seq wrapped before the old frame was answered
+                self._pending[seq] = (time.perf_counter(), command)
+            self.sent += 1
+        return encode_command(seq, command, ack)
+
+    def on_frame(self, seq, kind, value, valid):
+        """Handles one frame received from the device."""
+        if not valid:
+            metrics.inc("serial_frames_corrupt_total", device=self.name)
+            return
+        with self._lock:
+            pending = self._pending.pop(seq, None)
+            if pending is None:
+                return  # Late ack for a frame already counted as lost
+            delivered = kind == KIND_ACK or (kind == KIND_NAK and value == NAK_OVERFLOW)
+            if delivered:
+                rtt_ms = (time.perf_counter() - pending[0]) * 1000
+                self._rtts.append(rtt_ms)
+                self.acked += 1
+            if kind == KIND_NAK:
+                reason = NAK_REASONS.get(value, "other")
+                self.naks[reason] = self.naks.get(reason, 0) + 1
+        if delivered:
+            metrics.observe("serial_rtt_ms", rtt_ms, device=self.name)
+        if kind == KIND_NAK:
+            metrics.inc("serial_nak_total", device=self.name, reason=reason)
+
+    def expire(self):
+        """Counts frames unanswered for longer than ack_timeout as lost."""
+        deadline = time.perf_counter() - self.ack_timeout
+        with self._lock:
+            expired = [seq for seq, (sent_at, _) in self._pending.items() if sent_at < deadline]
+            for seq in expired:
+                del self._pending[seq]
+            if expired:
+                self._lost(len(expired))
+
+    def _lost(self, count):
+        self.lost += count
+        metrics.inc("serial_commands_lost_total", count, device=self.name)
+
+    def reset(self):
+        """Forgets pending frames (the port was reopened and the Arduino reset)."""
+        with self._lock:
+            self._pending.clear()
+
+    def stats(self):
+        with self._lock:
+            rtts = sorted(self._rtts)
+            pending = len(self._pending)
+
+        def percentile(p):
+            return round(rtts[min(len(rtts) - 1, int(len(rtts) * p))], 2) if rtts else None
+
+        return {
+            "sent": self.sent,
+            "acked": self.acked,
+            "lost": self.lost,
+            "naks": dict(self.naks),
+            "pending": pending,
+            "rtt_p50_ms": percentile(0.5),
+            "rtt_p99_ms": percentile(0.99),
+        }
@@ -1,109 +1,87 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-import serial
 import time
 import os
 
 
-from Follow_me_function import main
 from eye_controll import send_command as eye_controll
 from movement_controller import send_command as motor_controll
-import threading as td 
+import serial_bus
+# Client key -> Arduino command translation; the framed protocol shares these command sets
+from serial_protocol import MOTOR_MAP, FACE_MAP, CONTROL_MAP
+import metrics
+import warmup
+import intent_matcher
+import qa_index
+import llm_proxy
+import face_animator
+from follow_me_job import FollowMeJob, load_follow_me
 
-# --- CONFIGURATION (UPDATED FOR TWO ARDUINOS) ---
-MOTOR_SERIAL_PORT = 'Com23'
-FACE_SERIAL_PORT = 'COM12'
-SERIAL_BAUDRATE = 9600
-# ------------------------------------------------
+# Serial ports and baud rate are configured in serial_bus.py; it owns both
+# Arduino connections and writes commands from its own background threads.
+METRICS_LOG_INTERVAL = 30  # Seconds between metrics summary lines (None to disable)
 
 app = Flask(__name__)
 
 CORS(app, resources={r"/*": {"origins": "*"}})
 
 
-ser_motor = None
-ser_face = None
+def start_services():
+    """
+    Opens the serial ports and starts the background subsystems. Called when
+    the server runs, not on import, so benchmarks can drive the handlers alone.
+    """
+    # Open both ports in the background; handlers only enqueue commands.
+    serial_bus.motor.start()
+    serial_bus.face.start()
 
-def blink():
-    """Continuously sends a blink command 'B' to the face controller."""
-    
-    while True:
-        try:
-            eye_controll('B')
-            time.sleep(5) 
-        except Exception as e:
-            print(f"⚠️ Error in blink thread: {e}")
-            time.sleep(5)
-            
+    # Face commands all go through the animator, which also does the idle blinking.
+    face_animator.animator.start()
+
+    # Heavy subsystems warm up in the background; /health reports their progress.
+    warmup.start_background("follow_me", load_follow_me)
+    warmup.start_background("qa_index", qa_index.get_index)
+
+
+# Follow-me runs as a single background job, so its window never holds a request thread.
+follow_me_job = FollowMeJob()
 
-blink_thread = td.Thread(target=blink, daemon=True) 
-blink_thread.start()
-
-try:
-    ser_motor = serial.Serial(MOTOR_SERIAL_PORT, SERIAL_BAUDRATE, timeout=1)
-    print(f"✅ Successfully connected to Motor Arduino on {MOTOR_SERIAL_PORT} at {SERIAL_BAUDRATE} baud.")
-except serial.SerialException as e:
-    print(f"⚠️ Error: Could not open Motor serial port {MOTOR_SERIAL_PORT}. Details: {e}")
-    ser_motor = None
-
-try:
-    ser_face = serial.Serial(FACE_SERIAL_PORT, SERIAL_BAUDRATE, timeout=1)
-    print(f"✅ Successfully connected to Face Arduino on {FACE_SERIAL_PORT} at {SERIAL_BAUDRATE} baud.")
-except serial.SerialException as e:
-    print(f"⚠️ Error: Could not open Face serial port {FACE_SERIAL_PORT}. Details: {e}")
-    ser_face = None
-
-
-MOTOR_MAP = {
-    '3': '3', 
-    'r': 'b', 
-    '2': '4', 
-    '4': '2', 
-    '1': '5', 
-    '5': '1'  
-}
-
-FACE_MAP = {
-    'H': 'H',  
-    'B': 'B', 
-    'r': 'e'  
-}
-
-CONTROL_MAP = {
-    's': 's'  # Start/Stop toggle (controls the motor controller)
-}
 
 # --- Helper Function for Serial Communication (FIXED) ---
 
 def _send_serial_command(cmd, translation_map, endpoint_name, target_id):
     """
-    Translates command, calls the appropriate external function (motor/eye), 
-    and returns a Flask response.
+    Translates command, queues it via the appropriate external function (motor/eye), 
+    and returns a Flask response without waiting for the serial write.
     """
     
     # Translate the command from the client's simple key to the Arduino's expected character
     command_to_send = translation_map.get(cmd, cmd)
     
     try:
+        enqueue_start = time.perf_counter()
         if target_id == "motor":
-            # Assuming motor_controll handles its own connection and returns a bool/status
-            motor_controll(command_to_send) 
-            message = f"Command '{command_to_send}' sent via Motor API."
+            # motor_controll only enqueues; False means it was coalesced with a pending command
+            queued = motor_controll(command_to_send) 
+            message = f"Command '{command_to_send}' queued via Motor API."
             
         elif target_id == "face":
-            # Assuming eye_controll handles its own connection and returns a bool/status
-            eye_controll(command_to_send) 
-            message = f"Command '{command_to_send}' sent via Face API."
+            # eye_controll only enqueues; False means it was coalesced with a pending command
+            queued = eye_controll(command_to_send) 
+            message = f"Command '{command_to_send}' queued via Face API."
             
         else:
             return jsonify({"status": "error", "message": f"Invalid target identifier: {target_id}"}), 500
             
-        print(f"✅ Executed command: {command_to_send} (from client command '{cmd}')")
+        metrics.observe("serial_enqueue_ms", (time.perf_counter() - enqueue_start) * 1000, device=target_id)
+        print(f"✅ Queued command: {command_to_send} (from client command '{cmd}')")
         
         # CRITICAL FIX: Ensure a JSON response is returned on success
         return jsonify({
             "status": "success",
-            "message": message
+            "message": message,
+            "queued": queued,
+            "queue_depth": serial_bus.get_device(target_id).queue_depth()
         })
 
     except Exception as e:
@@ -148,8 +126,42 @@ def handle_face_command():
     if cmd not in FACE_MAP:
         return jsonify({"status": "error", "message": f"Invalid face command: {cmd}"}), 400
 
-    # CORRECT: Pass the string identifier "face"
-    return _send_serial_command(cmd, FACE_MAP, "Face API", "face")
+    sequence = face_animator.SEQUENCE_FOR_COMMAND[FACE_MAP[cmd]]
+    return _play_face_animation(sequence, data.get('mode', 'play'))
+
+
+@app.route('/api/face/animation', methods=['GET', 'POST'])
+def handle_face_animation():
+    """GET: animator status. POST {"sequence": name, "mode": "play"|"queue"|"cancel"}."""
+    if request.method == 'GET':
+        return jsonify({"status": "success", "animator": face_animator.animator.status()})
+    data = request.get_json(silent=True) or {}
+    mode = data.get('mode', 'play')
+    if mode == 'cancel':
+        face_animator.animator.cancel()
+        return jsonify({"status": "success", "animator": face_animator.animator.status()})
+    sequence = data.get('sequence')
+    if sequence not in face_animator.COMPILED_SEQUENCES:
+        return jsonify({"status": "error", "message": f"Unknown face sequence: {sequence}"}), 400
+    return _play_face_animation(sequence, mode)
+
+
+def _play_face_animation(sequence, mode):
+    """Starts (mode "play") or queues (mode "queue") a face sequence on the animator."""
+    if mode not in ('play', 'queue'):
+        return jsonify({"status": "error", "message": f"Invalid animation mode: {mode}"}), 400
+    try:
+        state = face_animator.animator.play(sequence, queue=(mode == 'queue'))
+    except Exception as e:
+        print(f"⚠️ Error playing face sequence {sequence}: {e}")
+        return jsonify({"status": "error", "message": f"Failed to play '{sequence}'. Details: {e}"}), 500
+    print(f"✅ Face sequence '{sequence}' {state}")
+    return jsonify({
+        "status": "success",
+        "message": f"Sequence '{sequence}' {state}.",
+        "animator": face_animator.animator.status(),
+        "queue_depth": serial_bus.face.queue_depth()
+    })
 
 
 @app.route('/api/command', methods=['POST'])
@@ -165,19 +177,9 @@ def handle_command():
     print(f"Received Command: '{cmd}'")
     print("="*30)
 
-    # --- SPECIAL CASE: Start tracking window ---
+    # --- SPECIAL CASE: Start tracking window (non-blocking) ---
     if cmd.lower() == "follow_me":
-        # Check if the required serial object is available for the blocking 'main' function
-        
-        try:
-            # CRITICAL: Pass the active serial object 'ser_motor' to the main function.
-            # If main() is blocking, this API call will block until it returns.
-            main() 
-            print("🚀 Follow Me mode activated.")
-            return jsonify({"status": "success", "message": "Follow Me window launched."})
-        except Exception as e:
-            print(f"❌ Error launching follow_me.py: {e}")
-            return jsonify({"status": "error", "message": f"Failed to launch follow_me.py: {e}"}), 500
+        return _start_follow_me()
     
 
     # --- Normal control command handling (e.g., 's' for Start/Stop) ---
@@ -188,7 +190,107 @@ def handle_command():
     return _send_serial_command(cmd, CONTROL_MAP, "Control API", "motor")
 
 
+def _start_follow_me():
+    if not follow_me_job.start():
+        return jsonify({"status": "error", "message": "Follow Me is already running.",
+                        "job": follow_me_job.status()}), 409
+    print("🚀 Follow Me mode activated.")
+    return jsonify({"status": "success", "message": "Follow Me window launching.",
+                    "job": follow_me_job.status()})
+
+
+@app.route('/api/follow_me/start', methods=['POST'])
+def handle_follow_me_start():
+    return _start_follow_me()
+
+
+@app.route('/api/follow_me/stop', methods=['POST'])
+def handle_follow_me_stop():
+    if not follow_me_job.is_running():
+        return jsonify({"status": "error", "message": "Follow Me is not running.",
+                        "job": follow_me_job.status()}), 409
+    stopped = follow_me_job.stop()
+    message = "Follow Me stopped." if stopped else "Stop requested; Follow Me is still shutting down."
+    return jsonify({"status": "success", "message": message, "job": follow_me_job.status()})
+
+
+@app.route('/api/follow_me/status', methods=['GET'])
+def handle_follow_me_status():
+    return jsonify({"status": "success", "job": follow_me_job.status()})
+
+
+@app.route('/api/serial/status', methods=['GET'])
+def handle_serial_status():
+    """Connection state, queue depth and counters for each Arduino."""
+    return jsonify({"status": "success", "devices": serial_bus.status()})
+
+
+@app.route('/api/intent', methods=['POST'])
+def handle_intent():
+    """
+    Resolves a chat transcript to a canned reply: keyword intents first, then
+    the local Q&A retrieval index. Unmatched questions go to the LLM fallback.
+    """
+    data = request.get_json(silent=True) or {}
+    text = data.get('text')
+    if not text:
+        return jsonify({"status": "error", "message": "Invalid request. 'text' key missing."}), 400
+    result = intent_matcher.get_matcher().match(text)
+    if result is None and warmup.is_ready("qa_index"):
+        result = qa_index.get_index().answer(text)
+        if result is not None:
+            result.update({"intent": f"qa:{result['question']}", "action": None, "match": "retrieval"})
+    if result is None:
+        return jsonify({"status": "success", "matched": False})
+    return jsonify({"status": "success", "matched": True, **result})
+
+
+@app.route('/api/intent/reload', methods=['POST'])
+def handle_intent_reload():
+    """Re-reads the intent files and rebuilds the Q&A index, so new intents need no restart."""
+    matcher = intent_matcher.reload()
+    index = qa_index.reload()
+    return jsonify({"status": "success", "intents": len(matcher.intents), "qa_questions": len(index.documents)})
+
+
+@app.route('/api/llm', methods=['POST'])
+def handle_llm():
+    """LLM fallback for questions no intent matched; cached, coalesced and time-boxed."""
+    data = request.get_json(silent=True) or {}
+    text = data.get('text')
+    if not text:
+        return jsonify({"status": "error", "message": "Invalid request. 'text' key missing."}), 400
+    start = time.perf_counter()
+    answer, source = llm_proxy.get_proxy().ask(text)
+    return jsonify({"status": "success", "response": answer, "source": source,
+                    "ms": round((time.perf_counter() - start) * 1000, 1)})
+
+
+@app.route('/api/llm/status', methods=['GET'])
+def handle_llm_status():
+    return jsonify({"status": "success", "llm": llm_proxy.get_proxy().stats()})
+
+
+@app.route('/health', methods=['GET'])
+def handle_health():
+    """Which subsystems are warm: serial links and the lazily loaded vision stack."""
+    subsystems = warmup.status()
+    for name, device in serial_bus.DEVICES.items():
+        subsystems[f"{name}_serial"] = {"state": "ready" if device.connected else "connecting"}
+    all_ready = all(info["state"] == "ready" for info in subsystems.values())
+    return jsonify({"status": "ok" if all_ready else "starting", "subsystems": subsystems})
+
+
+@app.route('/metrics', methods=['GET'])
+def handle_metrics():
+    """Prometheus-style metrics: serial write latency, queue depth, commands/s."""
+    return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == '__main__':
+    start_services()
+    if METRICS_LOG_INTERVAL:
+        metrics.start_periodic_log(METRICS_LOG_INTERVAL)
     print("🌐 Starting HTTP API server at http://127.0.0.1:5000")
     # Set debug to False for production use
     # use_reloader=False is set to prevent double initialization of serial ports
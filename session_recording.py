@@ -0,0 +1,233 @@
+"""
+Record and replay of follow-me sessions.
+
+A recording is a directory holding
+    frames.mjpeg   the processed camera frames, JPEG-encoded back to back
+    events.jsonl   one JSON object per line: a header, then frame, click and
+                   command events with their time `t` (seconds since start)
+
+    python Follow_me_function.py recordings/demo      # record a live session
+    python session_recording.py recordings/demo       # replay headless, as fast as possible
+    python session_recording.py recordings/demo --realtime --json result.json
+"""
+import argparse
+import difflib
+import json
+import os
+import threading
+import time
+import cv2
+import numpy as np
+import metrics
+
+# --- CONFIGURATION ---
+JPEG_QUALITY = 95   # Recording is lossy; replays of one recording are still identical
+# ---------------------
+
+FORMAT_VERSION = 1
+
+
+class Recorder:
+    """Appends frames, mouse clicks and motor commands to a recording directory."""
+
+    def __init__(self, path, jpeg_quality=JPEG_QUALITY):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.jpeg_quality = jpeg_quality
+        self._frames = open(os.path.join(path, "frames.mjpeg"), "wb")
+        self._events = open(os.path.join(path, "events.jsonl"), "w", encoding="utf-8")
+        self._lock = threading.Lock()
+        self._start = time.monotonic()
+        self._offset = 0
+        self.frame_count = 0
+        self._write({"type": "header", "version": FORMAT_VERSION, "created": time.time()})
+        print(f"⏺️ Recording session to {path}")
+
+    def _write(self, event):
+        self._events.write(json.dumps(event) + "\n")
+
+    def _now(self):
+        return round(time.monotonic() - self._start, 4)
+
+    def frame(self, frame):
+        ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            return
+        data = buffer.tobytes()
+        with self._lock:
+            self._frames.write(data)
+            self._write({"type": "frame", "t": self._now(), "index": self.frame_count,
+                         "offset": self._offset, "size": len(data)})
+            self._offset += len(data)
+            self.frame_count += 1
+
+    def click(self, x, y):
+        """A click lands after the newest recorded frame, which is what the user saw."""
+        with self._lock:
+            self._write({"type": "click", "t": self._now(), "x": int(x), "y": int(y),
+                         "after_frame": self.frame_count - 1})
+
+    def command(self, command):
+        with self._lock:
+            self._write({"type": "command", "t": self._now(), "command": command,
+                         "after_frame": self.frame_count - 1})
+
+    def close(self):
+        with self._lock:
+            self._frames.close()
+            self._events.close()
+        print(f"⏹️ Recorded {self.frame_count} frames to {self.path}")
+
+
+class Recording:
+    """Read side of a recording directory."""
+
+    def __init__(self, path):
+        self.path = path
+        self.frames_meta = []
+        self.clicks = {}     # after_frame -> [(x, y)]
+        self.commands = []   # [(after_frame, command)]
+        with open(os.path.join(path, "events.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                event = json.loads(line)
+                if event["type"] == "frame":
+                    self.frames_meta.append(event)
+                elif event["type"] == "click":
+                    self.clicks.setdefault(event["after_frame"], []).append((event["x"], event["y"]))
+                elif event["type"] == "command":
+                    self.commands.append((event["after_frame"], event["command"]))
+
+    def __len__(self):
+        return len(self.frames_meta)
+
+    def frames(self):
+        """Yields (index, t, frame) in recorded order."""
+        with open(os.path.join(self.path, "frames.mjpeg"), "rb") as f:
+            for meta in self.frames_meta:
+                f.seek(meta["offset"])
+                data = np.frombuffer(f.read(meta["size"]), np.uint8)
+                yield meta["index"], meta["t"], cv2.imdecode(data, cv2.IMREAD_COLOR)
+
+
+class ReplayCapture:
+    """
+    cv2.VideoCapture stand-in that plays a recording, so code written for a
+    camera (e.g. frame_pipeline.CaptureThread) can run on recorded frames.
+    realtime=True keeps the recorded frame timing.
+    """
+
+    def __init__(self, recording, realtime=True):
+        self.recording = recording
+        self.realtime = realtime
+        self._frames = recording.frames()
+        self._start = None
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        item = next(self._frames, None)
+        if item is None:
+            return False, None
+        _, t, frame = item
+        if self.realtime:
+            if self._start is None:
+                self._start = time.monotonic() - t
+            delay = self._start + t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return True, frame
+
+    def release(self):
+        self._frames.close()
+
+
+def diff_commands(recorded, replayed):
+    """Compares two [(after_frame, command)] streams by command order, then by frame."""
+    recorded_cmds = [command for _, command in recorded]
+    replayed_cmds = [command for _, command in replayed]
+    matcher = difflib.SequenceMatcher(a=recorded_cmds, b=replayed_cmds, autojunk=False)
+    first_divergence = next((i1 for tag, i1, _, _, _ in matcher.get_opcodes() if tag != "equal"), None)
+    frame_shifts = [b[0] - a[0] for a, b in zip(recorded, replayed) if a[1] == b[1]]
+    return {
+        "identical": recorded_cmds == replayed_cmds,
+        "recorded": len(recorded_cmds),
+        "replayed": len(replayed_cmds),
+        "similarity": round(matcher.ratio(), 4),
+        "first_divergence": first_divergence,
+        "max_frame_shift": max((abs(s) for s in frame_shifts), default=0),
+        "edits": [(tag, recorded_cmds[i1:i2], replayed_cmds[j1:j2])
+                  for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"][:20],
+    }
+
+
+def replay(path, realtime=False):
+    """
+    Feeds a recording through Follow_me_function's detection/tracking loop
+    with no window, camera, speech or serial port. Clicks are replayed after
+    the frame they were made on and motor commands are collected, then
+    diffed against the recorded ones. Returns a result dict.
+    """
+    import Follow_me_function as fm
+
+    recording = Recording(path)
+    fm.load_detector()
+    fm.reset_session()
+    replayed = []
+    current = {"frame": -1}
+    saved = fm.command_sink, fm.announcements
+    fm.command_sink = lambda command: replayed.append((current["frame"], command))
+    fm.announcements = False
+
+    process_ms = []
+    start = time.perf_counter()
+    replay_start = time.monotonic()
+    try:
+        for index, t, frame in recording.frames():
+            if realtime:
+                delay = replay_start + t - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            current["frame"] = index
+            frame_start = time.perf_counter()
+            fm.process_frame(frame, now=t)
+            process_ms.append((time.perf_counter() - frame_start) * 1000)
+            for x, y in recording.clicks.get(index, []):
+                fm.select_face(cv2.EVENT_LBUTTONDOWN, x, y, None, None)
+            if fm.exit_requested:
+                fm.check_and_send_command('s')  # What the UI loop does on Exit
+                break
+    finally:
+        fm.command_sink, fm.announcements = saved
+        fm.reset_session()
+    elapsed = time.perf_counter() - start
+
+    result = {
+        "recording": path,
+        "frames": len(process_ms),
+        "realtime": realtime,
+        "seconds": round(elapsed, 3),
+        "fps": round(len(process_ms) / elapsed, 2) if elapsed > 0 else None,
+        "process_ms": metrics.summarize(process_ms),
+        "commands": diff_commands(recording.commands, replayed),
+    }
+    commands = result["commands"]
+    print(f"Replayed {result['frames']} frames in {result['seconds']}s ({result['fps']} fps, "
+          f"p50 {result['process_ms'].get('p50')} ms, p99 {result['process_ms'].get('p99')} ms); "
+          f"commands {'identical' if commands['identical'] else 'DIFFER'} "
+          f"({commands['recorded']} recorded, {commands['replayed']} replayed)")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded follow-me session headless.")
+    parser.add_argument("path", help="recording directory")
+    parser.add_argument("--realtime", action="store_true", help="keep the recorded frame timing")
+    parser.add_argument("--json", metavar="FILE", help="write the result to FILE")
+    args = parser.parse_args()
+
+    result = replay(args.path, realtime=args.realtime)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    raise SystemExit(0 if result["commands"]["identical"] else 1)
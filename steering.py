@@ -0,0 +1,109 @@
+import time
+import metrics
+
+# --- CONFIGURATION ---
+ZONE_COMMANDS = ['5', '4', '3', '2', '1']  # Motor command per zone, left to right
+ZONE_NAMES = ["FAR LEFT", "LEFT", "CENTER", "RIGHT", "FAR RIGHT"]
+SMOOTHING = 0.4          # EMA weight of the newest centre (1.0 = no smoothing)
+SNAP_FRACTION = 0.25     # A jump larger than this fraction of the width bypasses the EMA
+HYSTERESIS = 0.25        # Fraction of a zone width the centre must cross past a boundary
+MIN_DWELL = 0.3          # Seconds a new zone must persist before its command is sent
+MAX_COMMAND_RATE = 4.0   # Commands per second sent to the motor at most
+# ---------------------
+
+
+class SteeringController:
+    """
+    Sits between the tracker and send_command. The face centre is smoothed
+    with an EMA (large jumps snap straight through so real movement is not
+    delayed). A new zone is commanded once the centre is past the hysteresis
+    margin of the commanded zone, or has stayed across its edge for
+    MIN_DWELL seconds, or is two or more zones away; whichever comes first.
+    Commands are capped at MAX_COMMAND_RATE per second.
+
+    update(center_x, width) -> (zone name, command to send or None).
+    """
+
+    def __init__(self, smoothing=SMOOTHING, snap_fraction=SNAP_FRACTION, hysteresis=HYSTERESIS,
+                 min_dwell=MIN_DWELL, max_command_rate=MAX_COMMAND_RATE, zones=ZONE_COMMANDS,
+                 names=ZONE_NAMES):
+        self.smoothing = smoothing
+        self.snap_fraction = snap_fraction
+        self.hysteresis = hysteresis
+        self.min_dwell = min_dwell
+        self.min_interval = 1.0 / max_command_rate if max_command_rate else 0.0
+        self.zones = list(zones)
+        self.names = list(names)
+        self.sent = 0
+        self.suppressed = 0
+        self.reset()
+
+    def reset(self):
+        """Forgets the smoothed centre and the last command (new target or stopped motor)."""
+        self.center = None
+        self.zone = None          # Zone the smoothed centre is in
+        self.commanded = None     # Zone whose command was last sent
+        self.candidate_zone = None  # Zone being held back, since when, and whether it was counted
+        self.candidate_since = None
+        self.candidate_counted = False
+        self.last_sent = float("-inf")
+
+    def _smooth(self, center_x, width):
+        if self.center is None or abs(center_x - self.center) > self.snap_fraction * width:
+            self.center = float(center_x)
+        else:
+            self.center += self.smoothing * (center_x - self.center)
+        return self.center
+
+    def _past_margin(self, center, zone_width):
+        """True once the centre is clearly past the commanded zone's edge (the hysteresis margin)."""
+        low = self.commanded * zone_width - self.hysteresis * zone_width
+        high = (self.commanded + 1) * zone_width + self.hysteresis * zone_width
+        return center < low or center >= high
+
+    def update(self, center_x, width, now=None):
+        now = time.monotonic() if now is None else now
+        center = self._smooth(center_x, width)
+        zone_width = width / len(self.zones)
+        self.zone = min(len(self.zones) - 1, max(0, int(center // zone_width)))
+        name = self.names[self.zone]
+
+        if self.zone == self.commanded:
+            self._clear_candidate()
+            return name, None
+
+        # The dwell runs from the moment the zone edge is crossed, and the
+        # command goes out as soon as either the margin or the dwell is passed
+        if self.zone != self.candidate_zone:
+            self._clear_candidate()
+            self.candidate_zone = self.zone
+            self.candidate_since = now
+        confirmed = (self.commanded is None or abs(self.zone - self.commanded) >= 2
+                     or self._past_margin(center, zone_width)
+                     or now - self.candidate_since >= self.min_dwell)
+        if not confirmed:
+            return name, self._suppress("dwell")
+        if now - self.last_sent < self.min_interval:
+            return name, self._suppress("rate")
+
+        self.commanded = self.zone
+        self._clear_candidate()
+        self.last_sent = now
+        self.sent += 1
+        metrics.inc("steering_commands_total", result="sent")
+        return name, self.zones[self.zone]
+
+    def _clear_candidate(self):
+        self.candidate_zone = self.candidate_since = None
+        self.candidate_counted = False
+
+    def _suppress(self, reason):
+        """Counts a held-back zone change once, however many frames it is held for."""
+        if not self.candidate_counted:
+            self.candidate_counted = True
+            self.suppressed += 1
+            metrics.inc("steering_commands_total", result="suppressed", reason=reason)
+        return None
+
+    def stats(self):
+        return {"sent": self.sent, "suppressed": self.suppressed}
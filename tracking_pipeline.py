@@ -0,0 +1,127 @@
+import cv2
+
+# --- CONFIGURATION ---
+TRACKER_TYPE = "csrt"     # csrt (accurate, slow), kcf (balanced), mosse (fastest)
+REDETECT_EVERY = 10       # Run the detector every N tracked frames (0 = only on trouble)
+MIN_IOU = 0.3             # Detection must overlap the tracked box this much to re-anchor
+MAX_SCALE_JUMP = 1.5      # Box area changing more than this per frame counts as low confidence
+MAX_LOST_FRAMES = 5       # Consecutive failures (tracker and detector) before giving up
+# ---------------------
+
+
+def _legacy_or_main(name):
+    """Tracker constructors moved to cv2.legacy in OpenCV 4.5+ for some types."""
+    factory = getattr(cv2, name, None)
+    if factory is None and hasattr(cv2, "legacy"):
+        factory = getattr(cv2.legacy, name, None)
+    return factory
+
+
+TRACKER_FACTORIES = {
+    "csrt": "TrackerCSRT_create",
+    "kcf": "TrackerKCF_create",
+    "mosse": "TrackerMOSSE_create",
+}
+
+
+def create_tracker(tracker_type=TRACKER_TYPE):
+    """Creates an OpenCV tracker by name (csrt, kcf or mosse)."""
+    factory_name = TRACKER_FACTORIES.get(tracker_type.lower())
+    if factory_name is None:
+        raise ValueError(f"Unknown tracker type '{tracker_type}', expected one of {list(TRACKER_FACTORIES)}")
+    factory = _legacy_or_main(factory_name)
+    if factory is None:
+        raise RuntimeError(f"Tracker '{tracker_type}' is not available in this OpenCV build (needs opencv-contrib-python)")
+    return factory()
+
+
+def iou(box_a, box_b):
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    inter_w = min(ax + aw, bx + bw) - max(ax, bx)
+    inter_h = min(ay + ah, by + bh) - max(ay, by)
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    return inter / float(aw * ah + bw * bh - inter)
+
+
+class HybridTracker:
+    """
+    Tracks one face with a cheap OpenCV tracker and re-runs the detector
+    every REDETECT_EVERY frames, or as soon as the tracker fails or its box
+    jumps in scale. The tracker is re-anchored to the detection that best
+    overlaps (IoU) the last known box, which stops slow drift.
+
+    detect_fn(frame, focus_box) must return (x, y, w, h) face boxes; focus_box
+    is the last tracked (x, y, w, h) box, which it may use to search a crop.
+    Exposes update(frame) -> (success, box) like an OpenCV tracker.
+    """
+
+    def __init__(self, detect_fn, tracker_type=TRACKER_TYPE, redetect_every=REDETECT_EVERY,
+                 min_iou=MIN_IOU, max_lost_frames=MAX_LOST_FRAMES):
+        self.detect_fn = detect_fn
+        self.tracker_type = tracker_type
+        self.redetect_every = redetect_every
+        self.min_iou = min_iou
+        self.max_lost_frames = max_lost_frames
+        self.tracker = None
+        self.box = None
+        self.frames_since_detect = 0
+        self.lost_frames = 0
+        self.reanchors = 0
+
+    def init(self, frame, box):
+        self.box = tuple(int(v) for v in box)
+        self.tracker = create_tracker(self.tracker_type)
+        self.tracker.init(frame, self.box)
+        self.frames_since_detect = 0
+        self.lost_frames = 0
+
+    def update(self, frame):
+        success, bbox = self.tracker.update(frame)
+        new_box = tuple(int(v) for v in bbox) if success else None
+        self.frames_since_detect += 1
+
+        low_confidence = not success or self._scale_jumped(new_box)
+        due = self.redetect_every and self.frames_since_detect >= self.redetect_every
+        if low_confidence or due:
+            anchored = self._reanchor(frame, new_box if success else self.box)
+            if anchored is not None:
+                new_box = anchored
+                success = True
+            elif low_confidence:
+                success = False
+
+        if not success:
+            self.lost_frames += 1
+            # Coast on the last known box until the detector has had a few tries
+            return self.lost_frames < self.max_lost_frames, self.box
+
+        self.lost_frames = 0
+        self.box = new_box
+        return True, self.box
+
+    def _scale_jumped(self, new_box):
+        old_area = self.box[2] * self.box[3]
+        new_area = new_box[2] * new_box[3]
+        if old_area <= 0 or new_area <= 0:
+            return True
+        ratio = new_area / old_area
+        return ratio > MAX_SCALE_JUMP or ratio < 1 / MAX_SCALE_JUMP
+
+    def _reanchor(self, frame, reference_box):
+        """Re-initialises the tracker on the detection best matching reference_box."""
+        self.frames_since_detect = 0
+        best_box, best_iou = None, self.min_iou
+        for face in self.detect_fn(frame, reference_box):
+            overlap = iou(reference_box, face)
+            if overlap >= best_iou:
+                best_box, best_iou = tuple(int(v) for v in face), overlap
+        if best_box is None:
+            return None
+        self.tracker = create_tracker(self.tracker_type)
+        self.tracker.init(frame, best_box)
+        self.reanchors += 1
+        return best_box
@@ -0,0 +1,161 @@
+import hashlib
+import itertools
+import os
+import queue
+import threading
+import time
+import metrics
+
+try:
+    import pyttsx3
+except ImportError:
+    pyttsx3 = None  # No speech; announcements are logged and skipped
+
+try:
+    import winsound  # Plays the cached WAV files (Windows only)
+except ImportError:
+    winsound = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# --- CONFIGURATION ---
+VOICE_INDEX = 1          # Index into engine.getProperty('voices'); falls back to the default voice
+RATE = 150
+VOLUME = 1.0
+CACHE_DIR = os.path.join(BASE_DIR, "tts_cache")
+QUEUE_SIZE = 16          # Announcements waiting to be spoken; extra ones are dropped
+
+PRIORITY_URGENT = 0      # Tracking lost, deselection
+PRIORITY_NORMAL = 1      # Greetings and goodbyes
+PRIORITY_BACKGROUND = 2  # Pre-rendering cached phrases
+# ---------------------
+
+
+class TtsWorker:
+    """
+    Owns the pyttsx3 engine on a single thread and speaks announcements from
+    a priority queue, so callers never block and never share the engine.
+    The voice is configured once. Phrases passed as `phrases` are rendered to
+    WAV files in CACHE_DIR in the background and played from there (instant
+    start); anything else, or any phrase when winsound is unavailable, is
+    synthesised live.
+    """
+
+    def __init__(self, phrases=(), cache_dir=CACHE_DIR, queue_size=QUEUE_SIZE):
+        self.phrases = list(phrases)
+        self.cache_dir = cache_dir
+        self._queue = queue.PriorityQueue(maxsize=queue_size)
+        self._seq = itertools.count()
+        self._cache = {}  # text -> WAV path
+        self._engine = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self.ready = threading.Event()
+        self.failed = None  # Why the engine could not start; the worker then stays down
+        self.spoken = 0
+        self.cache_hits = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        """Starts the worker (idempotent) and queues the phrase pre-rendering."""
+        with self._lock:
+            if self.failed is not None or (self._thread is not None and self._thread.is_alive()):
+                return
+            self._thread = threading.Thread(target=self._run, name="tts", daemon=True)
+            self._thread.start()
+        if winsound is not None:
+            for text in self.phrases:
+                self._put(PRIORITY_BACKGROUND, "render", text)
+
+    def say(self, text, priority=PRIORITY_NORMAL):
+        """Queues `text` to be spoken. Never blocks; returns False if the announcement was dropped."""
+        if self.failed is not None:
+            print(f"🔇 TTS unavailable ({self.failed}), not speaking: {text}")
+            return False
+        self.start()
+        return self._put(priority, "say", text)
+
+    def stop(self):
+        self._put(-1, "stop", None, block=True)
+
+    def _put(self, priority, action, text, block=False):
+        try:
+            self._queue.put((priority, next(self._seq), action, text), block=block, timeout=1 if block else None)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"⚠️ TTS queue full, dropped: {text}")
+            return False
+
+    def _configure(self):
+        if pyttsx3 is None:
+            raise RuntimeError("pyttsx3 is not installed")
+        engine = pyttsx3.init()
+        voices = engine.getProperty('voices')
+        if voices and len(voices) > VOICE_INDEX:
+            engine.setProperty('voice', voices[VOICE_INDEX].id)
+        engine.setProperty('rate', RATE)
+        engine.setProperty('volume', VOLUME)
+        return engine
+
+    def _cache_path(self, text):
+        key = hashlib.sha1(f"{VOICE_INDEX}|{RATE}|{VOLUME}|{text}".encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def _render(self, text):
+        path = self._cache_path(text)
+        if not os.path.exists(path):
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._engine.save_to_file(text, path)
+            self._engine.runAndWait()
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            self._cache[text] = path
+
+    def _speak(self, text):
+        start = time.perf_counter()
+        path = self._cache.get(text)
+        if path is not None and winsound is not None:
+            winsound.PlaySound(path, winsound.SND_FILENAME)
+            self.cache_hits += 1
+            source = "cache"
+        else:
+            self._engine.say(text)
+            self._engine.runAndWait()
+            source = "live"
+        self.spoken += 1
+        metrics.observe("tts_speak_ms", (time.perf_counter() - start) * 1000, source=source)
+
+    def _run(self):
+        try:
+            self._engine = self._configure()
+        except Exception as e:
+            print(f"❌ TTS engine failed to start: {e}")
+            self.errors += 1
+            self.failed = str(e) or type(e).__name__
+            return
+        self.ready.set()
+        while True:
+            _, _, action, text = self._queue.get()
+            if action == "stop":
+                break
+            try:
+                if action == "render":
+                    self._render(text)
+                else:
+                    self._speak(text)
+            except Exception as e:
+                # A failed announcement must never take the worker (or tracking) down
+                self.errors += 1
+                print(f"⚠️ TTS error for '{text}': {e}")
+
+    def stats(self):
+        return {
+            "spoken": self.spoken,
+            "cache_hits": self.cache_hits,
+            "cached_phrases": len(self._cache),
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "failed": self.failed,
+            "queued": self._queue.qsize(),
+        }
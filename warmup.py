@@ -0,0 +1,87 @@
+import threading
+import time
+
+# Subsystems registered with start_background(), keyed by name
+_subsystems = {}
+_lock = threading.Lock()
+
+
+class Subsystem:
+    """Readiness flag for one lazily initialised part of the robot."""
+
+    def __init__(self, name):
+        self.name = name
+        self.ready = threading.Event()
+        self.error = None
+        self.value = None
+        self.started_at = time.monotonic()
+        self.ready_at = None
+
+    def status(self):
+        if self.ready.is_set():
+            state = "ready"
+        elif self.error is not None:
+            state = "failed"
+        else:
+            state = "warming"
+        info = {"state": state}
+        if self.ready_at is not None:
+            info["warmup_seconds"] = round(self.ready_at - self.started_at, 3)
+        if self.error is not None:
+            info["error"] = str(self.error)
+        return info
+
+
+def start_background(name, init_fn):
+    """
+    Runs init_fn() in a daemon thread and marks `name` ready when it returns.
+    Calling it again for the same name is a no-op, unless the previous attempt failed.
+    """
+    with _lock:
+        subsystem = _subsystems.get(name)
+        if subsystem is not None and subsystem.error is None:
+            return subsystem
+        subsystem = _subsystems[name] = Subsystem(name)
+
+    def _run():
+        try:
+            subsystem.value = init_fn()
+            subsystem.ready_at = time.monotonic()
+            subsystem.ready.set()
+            print(f"✅ {name} ready after {subsystem.ready_at - subsystem.started_at:.2f}s")
+        except Exception as e:
+            subsystem.error = e
+            print(f"⚠️ {name} failed to initialise: {e}")
+
+    threading.Thread(target=_run, name=f"warmup-{name}", daemon=True).start()
+    return subsystem
+
+
+def wait_for(name, timeout=None):
+    """
+    Blocks until `name` is ready and returns what its init function returned.
+    Raises RuntimeError if it failed or is still warming after `timeout`.
+    """
+    with _lock:
+        subsystem = _subsystems.get(name)
+    if subsystem is None:
+        raise RuntimeError(f"Subsystem '{name}' was never started")
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not subsystem.ready.wait(0.05):
+        if subsystem.error is not None:
+            raise RuntimeError(f"Subsystem '{name}' failed to initialise: {subsystem.error}")
+        if deadline is not None and time.monotonic() >= deadline:
+            raise RuntimeError(f"Subsystem '{name}' is still warming up")
+    return subsystem.value
+
+
+def is_ready(name):
+    with _lock:
+        subsystem = _subsystems.get(name)
+    return subsystem is not None and subsystem.ready.is_set()
+
+
+def status():
+    with _lock:
+        subsystems = dict(_subsystems)
+    return {name: subsystem.status() for name, subsystem in subsystems.items()}